@@ -1,4 +1,3 @@
-import copy
 import math
 import time
 import random
@@ -58,85 +57,145 @@ instances = dict(zip(files, seeds))
 #              "r202C15": 64,
 #              "rc202C15": 76}
 
-for file, seed in instances.items():
+
+class Search:
+    """The state of one ALNS trajectory, so that it can be run in parts
+    (e.g. by an island that exchanges solutions with other trajectories between the parts)"""
+    def __init__(self, data, rnd):
+        """initializes the operations and constructs the initial solution
+        :param data: the instance data from the Reader
+        :param rnd: the RND used for this instance run"""
+        self.data = data
+        self.rnd = rnd
+        self.T = None
+        self.CR = CustomerRemoval(data, rnd)
+        self.CI = CustomerInsertion(data, rnd)
+        self.SR = StationRemoval(data, rnd)
+        self.SI = StationInsertion(data, rnd)
+
+        self.previous_solution = construct_initial_solution(data)
+        self.best_solution = self.previous_solution
+        self.j = 1
+
+    def iterate(self, n, verbose=True):
+        """runs n iterations of the ALNS
+        :param n: the number of iterations
+        :param verbose: True if the iterations are printed"""
+        for _ in range(n):
+            if verbose:
+                print(f"================== iteration {self.j - 1} ===========================")
+            current_solution = self.previous_solution.copy()
+            operations_used = []
+            # SR and SI
+            if self.j % N_SR == 0:
+                operation, current_solution = self.SR.station_removal(current_solution)
+                operations_used.append((self.SR, operation))
+                operation, current_solution = self.SI.station_insertion(current_solution)
+                operations_used.append((self.SI, operation))
+            # RR
+            elif self.j % N_RR == 0:
+                for i in range(n_RR):
+                    operation, removed, current_solution = self.CR.route_removal(current_solution)
+                    operations_used.append((self.CR, operation))
+                    operation, current_solution = self.CI.customer_insertion(current_solution, removed)
+                    operations_used.append((self.CI, operation))
+            # CR and CI
+            else:
+                operation, removed, current_solution = self.CR.customer_removal(current_solution)
+                operations_used.append((self.CR, operation))
+                operation, current_solution = self.CI.customer_insertion(current_solution, removed)
+                operations_used.append((self.CI, operation))
+
+            # If a feasible solution was constructed, update the scores
+            if current_solution.is_feasible and current_solution.is_battery_feasible:
+                current_solution.remove_empty_routes()
+                current_cost = current_solution.total_cost
+                score = 0
+
+                if self.T == None:
+                    self.T = temp_control_param * current_cost / math.log(2) / 100
+                else:
+                    self.T *= cooling_rate
+
+                best_cost = self.best_solution.total_cost
+                previous_cost = self.previous_solution.total_cost
+
+                if current_cost < best_cost:
+                    self.best_solution = current_solution
+                    score += sigma_1
+                elif current_cost < previous_cost:
+                    score += sigma_2
+                elif helper.simulated_annealing(self.rnd, self.T, self.best_solution, current_solution):
+                    score += sigma_3
+
+                self.previous_solution = current_solution
+                helper.increase_score(operations_used, score)
+
+            self.j += 1
+
+            # Updating weights
+            if self.j % N_C == 0:
+                self.CR = helper.update_weights(self.CR)
+                self.CI = helper.update_weights(self.CI)
+            if self.j % N_S == 0:
+                self.SR = helper.update_weights(self.SR)
+                self.SI = helper.update_weights(self.SI)
+
+    def get_weights(self):
+        """:return: the weights of the operations of CR, CI, SR and SI, as lists in the order of the operations"""
+        return [[type.weights[operation] for operation in type.operations] for type in (self.CR, self.CI, self.SR, self.SI)]
+
+    def set_weights(self, weights):
+        """:param weights: the weights of the operations of CR, CI, SR and SI, as given by get_weights"""
+        for type, type_weights in zip((self.CR, self.CI, self.SR, self.SI), weights):
+            for operation, weight in zip(type.operations, type_weights):
+                type.weights[operation] = weight
+
+    def restart(self, solution, weights=None):
+        """continues the search from a solution that is at least as good as the best solution found so far
+        :param solution: the solution to continue from
+        :param weights: the weights of the operations to continue with, or None to keep the current ones"""
+        self.previous_solution = solution
+        self.best_solution = solution
+
+        if weights is not None:
+            self.set_weights(weights)
+
+
+def run_alns(data, rnd, verbose=True):
+    """runs the ALNS on one instance, starting from the initial solution
+    :param data: the instance data from the Reader
+    :param rnd: the RND used for this instance run
+    :param verbose: True if the iterations are printed
+    :return: the best solution found"""
+    search = Search(data, rnd)
+    search.iterate(n_iter, verbose)
+    return search.best_solution
+
+
+def solve_instance(file, seed, verbose=True, output_name=None):
+    """runs the ALNS on an instance, checks the best solution and saves it to a json file
+    :param file: the name of the instance file
+    :param seed: the seed of the RND used for this instance run
+    :param verbose: True if the iterations are printed
+    :param output_name: the name of the json file the solution is saved to, the name of the instance file by default
+    :return: the best solution found and the time it took in seconds"""
     start_time = time.time()
-    T = None
     path = "evrptw_instances//" + file + ".xlsx"
     data = Reader(path)
     rnd = random.Random()
     rnd.seed(seed)
 
-    CR = CustomerRemoval(data, rnd)
-    CI = CustomerInsertion(data, rnd)
-    SR = StationRemoval(data, rnd)
-    SI = StationInsertion(data, rnd)
-
-    previous_solution = construct_initial_solution(data)
-    best_solution = previous_solution
-    j = 1
-
-
-    for k in range(n_iter):
-        print(f"================== iteration {k} ===========================")
-        current_solution = copy.deepcopy(previous_solution)
-        operations_used = []
-        # SR and SI
-        if j % N_SR == 0:
-            operation, current_solution = SR.station_removal(current_solution)
-            operations_used.append((SR, operation))
-            operation, current_solution = SI.station_insertion(current_solution)
-            operations_used.append((SI, operation))
-        # RR
-        elif j % N_RR == 0:
-            for i in range(n_RR):
-                operation, removed, current_solution = CR.route_removal(current_solution)
-                operations_used.append((CR, operation))
-                operation, current_solution = CI.customer_insertion(current_solution, removed)
-                operations_used.append((CI, operation))
-        # CR and CI
-        else:
-            operation, removed, current_solution = CR.customer_removal(current_solution)
-            operations_used.append((CR, operation))
-            operation, current_solution = CI.customer_insertion(current_solution, removed)
-            operations_used.append((CI, operation))
-
-        # If a feasible solution was constructed, update the scores
-        if current_solution.is_feasible and current_solution.is_battery_feasible:
-            current_solution.remove_empty_routes()
-            current_cost = current_solution.total_cost
-            score = 0
-
-            if T == None:
-                T = temp_control_param * current_cost / math.log(2) / 100
-            else:
-                T *= cooling_rate
-
-            best_cost = best_solution.total_cost
-            previous_cost = previous_solution.total_cost
-
-            if current_cost < best_cost:
-                best_solution = current_solution
-                score += sigma_1
-            elif current_cost < previous_cost:
-                score += sigma_2
-            elif helper.simulated_annealing(rnd, T, best_solution, current_solution):
-                score += sigma_3
-
-            previous_solution = current_solution
-            helper.increase_score(operations_used, score)
-
-        j += 1
-
-        # Updating weights
-        if j % N_C == 0:
-            CR = helper.update_weights(CR)
-            CI = helper.update_weights(CI)
-        if j % N_S == 0:
-            SR = helper.update_weights(SR)
-            SI = helper.update_weights(SI)
+    best_solution = run_alns(data, rnd, verbose)
 
     end_time = time.time()
     elapsed_time = end_time - start_time
 
     helper.check_feasibility(data, best_solution)
-    helper.solution_to_JSON(best_solution, file, elapsed_time)
\ No newline at end of file
+    helper.solution_to_JSON(best_solution, output_name or file, elapsed_time)
+    return best_solution, elapsed_time
+
+
+if __name__ == "__main__":
+    for file, seed in instances.items():
+        solve_instance(file, seed)
@@ -0,0 +1,53 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import config
+
+# ALNS and the modules it uses are only imported inside the functions: they read the configuration when they are imported,
+# so every job changes the configuration first, in a fresh process
+
+
+def run_job(file, seed, settings):
+    """runs the ALNS on one instance in a worker process, the best solution is saved to a json file as in ALNS.py,
+    named after the seed and the settings as well, so the jobs on the same instance do not overwrite each other's solutions
+    :param file: the name of the instance file
+    :param seed: the seed of the RND used for this instance run
+    :param settings: the configuration of this run, names of the variables in config and their values
+    :return: the name of the instance file, the seed, the cost of the best solution and the time it took in seconds"""
+    config.update(**settings)
+    import ALNS
+
+    output_name = file + "_seed" + str(seed) + "".join("_" + name + str(value) for name, value in sorted(settings.items()))
+    best_solution, elapsed_time = ALNS.solve_instance(file, seed, verbose=False, output_name=output_name)
+    return file, seed, best_solution.total_cost, elapsed_time
+
+
+def run_campaign(jobs, max_workers=None):
+    """runs the jobs in parallel, every job in its own process with the same seed as in the serial run,
+    so the solutions are the same. The solutions are saved as soon as their job finishes
+    :param jobs: a list of tuples (name of the instance file, seed, configuration settings)
+    :param max_workers: the number of processes running at the same time, the number of cores by default
+    :return: a list of the results of the jobs in the order they finished"""
+    results = []
+    start_time = time.time()
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=context, max_tasks_per_child=1) as executor:
+        futures = [executor.submit(run_job, file, seed, settings) for file, seed, settings in jobs]
+
+        for future in as_completed(futures):
+            file, seed, cost, elapsed_time = future.result()
+            results.append((file, seed, cost, elapsed_time))
+            print(f"{len(results)}/{len(jobs)} {file} (seed {seed}): cost {cost:.2f} in {elapsed_time:.1f} s, "
+                  f"{time.time() - start_time:.1f} s since the start")
+
+    return results
+
+
+if __name__ == "__main__":
+    import ALNS
+
+    # the same instances and seeds as the serial run in ALNS.py
+    run_campaign([(file, seed, {}) for file, seed in ALNS.instances.items()])
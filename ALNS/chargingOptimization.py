@@ -0,0 +1,96 @@
+import math
+# battery levels and times are sums of floats, so a bound is only taken as violated when it is missed by more than this tolerance,
+# the same tolerance as in LocationVisit.is_feasible and LocationVisit.is_battery_feasible
+from locationVisit import FEASIBILITY_TOLERANCE
+
+# bounds computed from sums in another order than the routes propagate them keep this margin, which is larger than the rounding
+# of these sums, e.g. the charges keep it to the time windows so that the routes built with them arrive before the due times
+ROUNDING_MARGIN = 1e-7
+
+
+def least_recharge_quantities(data, locs):
+    """Computes the charged quantities of a route with the free PR strategy that make it battery feasible and time feasible
+    with the least total recharge, for the given sequence of visits, or None if no charged quantities make it so.
+    Q_j, the quantity charged up to and including the j-th station visit, is bounded by the energy consumed before the visit
+    (the battery is not charged above its capacity) and by the energy needed to reach the next station visit.
+    Every charge delays the following visits, so the quantity charged between two station visits a < b is bounded by the time windows
+    of the visits around them, Q_b - Q_a <= (latest start of segment a + latest arrival of segment b) / recharging rate.
+    These are difference constraints between the Q_j and the Q_j do not decrease, so the bound of a pair also holds for the pairs
+    between them: with the prefix minimum of the latest starts and the suffix minimum of the latest arrivals,
+    the largest Q_j satisfying all constraints are found by one forward sweep with a running minimum and one backward sweep.
+    The bounds are found in one pass over the visits, so the whole computation is linear in the number of visits
+    :param data: data object of the current instance
+    :param locs: location indices of all visits of the route, including the two depot visits
+    :return: the charged quantities at all visits including the two depot visits, or None"""
+    n = len(locs)
+    capacity = data.battery_capacity
+    # energy consumed and time spent servicing and travelling from the start of the route until the arrival to each visit
+    energy = [0] * n
+    duration = [0] * n
+    for k in range(1, n):
+        distance = data.distance_matrix[locs[k - 1], locs[k]]
+        energy[k] = energy[k - 1] + data.battery_consumption_rate * distance
+        duration[k] = duration[k - 1] + data.service_time[locs[k - 1]] + distance / data.velocity
+
+    # segment j holds the visits after the j-th station visit up to and including the next one (the start of the route is station 0),
+    # the arrival to a visit of segment j is delayed by Q_j, the departure from it only by the charges of the later station visits
+    stations = [0]
+    # for each segment: the latest start relative to the duration (before the charges) and the latest arrival relative to the duration
+    latest_start = [math.inf]
+    latest_arrival = [math.inf]
+    # the latest start among the earlier visits of the current segment
+    segment_latest_start = math.inf
+
+    for k in range(n):
+        loc = locs[k]
+        # the visits of one segment are not separated by a charge, their time windows have to be met as they are
+        if data.due_time[loc] - duration[k] + segment_latest_start < -FEASIBILITY_TOLERANCE:
+            return None
+
+        latest_arrival[-1] = min(latest_arrival[-1], data.due_time[loc] - duration[k])
+        latest_start[-1] = min(latest_start[-1], duration[k] - data.ready_time[loc])
+        segment_latest_start = min(segment_latest_start, duration[k] - data.ready_time[loc])
+
+        if data.type[loc] == "f" and 0 < k < n - 1:
+            stations.append(k)
+            latest_start.append(math.inf)
+            latest_arrival.append(math.inf)
+            segment_latest_start = math.inf
+
+    m = len(stations) - 1
+    # the energy needed to reach the end of each segment, the last one ends at the depot
+    segment_ends = stations[1:] + [n - 1]
+    if energy[segment_ends[0]] - capacity > FEASIBILITY_TOLERANCE:
+        return None
+
+    # the time bound of the pair a < b only depends on the earliest segment a' <= a and the latest segment b' >= b
+    for j in range(m, 0, -1):
+        latest_arrival[j - 1] = min(latest_arrival[j - 1], latest_arrival[j])
+    for j in range(1, m + 1):
+        latest_start[j] = min(latest_start[j], latest_start[j - 1])
+
+    total_charge = max(0, energy[-1] - capacity)
+    # forward sweep: the largest Q_j allowed by the energy before the visit, the total charge and the time bounds to the earlier Q_a,
+    # the running minimum keeps min over a < j of Q_a * recharging rate + latest start of a
+    charged = [0] * (m + 1)
+    earliest_bound = latest_start[0]
+    for j in range(1, m + 1):
+        # the margin keeps the route time feasible up to the rounding of the arrival times
+        time_bound = earliest_bound + latest_arrival[j] - ROUNDING_MARGIN
+        if latest_start[j - 1] + latest_arrival[j] - ROUNDING_MARGIN < 0:
+            # no charge fits between segments j - 1 and j, not even none
+            return None
+        charged[j] = min(energy[stations[j]], total_charge, time_bound / data.recharging_rate)
+        earliest_bound = min(earliest_bound, charged[j] * data.recharging_rate + latest_start[j])
+
+    # backward sweep: the Q_j do not decrease, and Q_j has to reach the energy needed to the end of segment j
+    for j in range(m, 0, -1):
+        if j < m:
+            charged[j] = min(charged[j], charged[j + 1])
+        if charged[j] < 0 or charged[j] < energy[segment_ends[j]] - capacity:
+            return None
+
+    charges = [0] * n
+    for j in range(1, m + 1):
+        charges[stations[j]] = max(0, charged[j] - charged[j - 1])
+    return charges
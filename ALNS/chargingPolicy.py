@@ -0,0 +1,156 @@
+import numpy as np
+import config
+
+
+class FreePR:
+    """Charging rules of the free PR strategy: an inserted station charges the quantity the route still requires,
+    and after a customer insertion the last station before the customer is recharged as far as the time windows allow"""
+    battery_degradation = False
+    # an inserted station charges the required charge up to its battery space and no other station is recharged,
+    # so station insertions can be decided from the bound of inserted_station_charge_bound
+    exact_station_insertion = True
+
+    def __init__(self, data):
+        """:param data: data object of the current instance"""
+        self.data = data
+        # the battery level at the start of the route and the battery level it may end with
+        self.initial_battery_level = data.battery_capacity
+        self.final_battery_level = 0
+        # True if the charges are redistributed with the least total recharge when recharging the last station is not enough
+        self.least_recharge = config.LEAST_RECHARGE
+
+    def __deepcopy__(self, memo):
+        """a policy is never altered, so deep copies of routes share it
+        :param memo: the deepcopy memo"""
+        return self
+
+    def required_charge(self, distance, charged_quantity):
+        """Calculates the amount vehicle needs to be charged in order to reach the depot with the final battery level
+        :param distance: the distance of the route
+        :param charged_quantity: the quantity charged at all visits of the route
+        :return: the required charge"""
+        return max(0, distance * self.data.battery_consumption_rate - self.initial_battery_level - charged_quantity + self.final_battery_level)
+
+    def is_final_battery_feasible(self, battery_level):
+        """:param battery_level: the battery level upon arrival to the final depot visit
+        :return: True if the route may end with this battery level (apart from the battery feasibility of the visit itself)"""
+        return True
+
+    def inserted_station_charge(self, route, available_battery_space):
+        """the quantity charged at an inserted station
+        :param route: the route (or the evaluation of a move on it) after the distance of the insertion was added
+        :param available_battery_space: the battery space upon arrival to the station
+        :return: the charge quantity"""
+        required_charge = route.required_charge
+        if required_charge > 0:
+            return min(required_charge, available_battery_space)
+        return 0
+
+    def merged_station_charge(self, charge_quantity, battery_level_upon_arrival, inserted_charge_quantity):
+        """the quantity charged at a station visit when the same station is inserted right before or after it
+        :param charge_quantity: the charged quantity of the visit
+        :param battery_level_upon_arrival: the battery level upon arrival to the visit
+        :param inserted_charge_quantity: the quantity the inserted station would charge
+        :return: the new charge quantity of the visit"""
+        return charge_quantity + inserted_charge_quantity
+
+    def repair_after_insert(self, route, loc, idx):
+        """recharges the existing stations of the route after an insertion
+        :param route: the route (or the evaluation of a move on it)
+        :param loc: location index of the insertion
+        :param idx: position index of the inserted location"""
+        if self.data.type[loc] == "c":
+            route.adjust_recharge(idx)
+
+    def inserted_station_charge_bound(self, route, idx, detours, battery_levels):
+        """Bounds the charge an inserted station adds to the route from above, for many stations and positions at once:
+        the inserted station charges at most the battery space upon arrival, the charges of the following stations can only decrease
+        :param route: the route
+        :param idx: position index of the insertion, or a NumPy column of position indices with a row of stations for each
+        :param detours: NumPy array of the changes in distance caused by the stations
+        :param battery_levels: NumPy array of the battery levels upon arrival to the stations
+        :return: NumPy array of the bounds"""
+        return self.data.battery_capacity - battery_levels
+
+
+class BatteryDegradation(FreePR):
+    """Charging rules of the free PR strategy when battery degradation is considered (EVRPTW-BD):
+    the route starts with the battery charged to UB and has to end with at least LB"""
+    battery_degradation = True
+
+    def __init__(self, data):
+        """:param data: data object of the current instance"""
+        super().__init__(data)
+        self.initial_battery_level = data.UB
+        self.final_battery_level = data.LB
+        self.least_recharge = False
+
+    def is_final_battery_feasible(self, battery_level):
+        """:param battery_level: the battery level upon arrival to the final depot visit
+        :return: True if the route ends with at least LB"""
+        return battery_level >= self.data.LB
+
+
+class FixedPR(FreePR):
+    """Charging rules of the fixed PR strategy: an inserted station charges PR_STRATEGY of the battery capacity,
+    and after every insertion the last station before the first battery violation is charged full if the time windows allow it"""
+    exact_station_insertion = False
+
+    def __init__(self, data):
+        """:param data: data object of the current instance"""
+        super().__init__(data)
+        self.pr_strategy = config.PR_STRATEGY * data.battery_capacity
+        self.least_recharge = False
+
+    def inserted_station_charge(self, route, available_battery_space):
+        """the quantity charged at an inserted station
+        :param route: the route (or the evaluation of a move on it) after the distance of the insertion was added
+        :param available_battery_space: the battery space upon arrival to the station
+        :return: the charge quantity"""
+        return min(self.pr_strategy, available_battery_space)
+
+    def merged_station_charge(self, charge_quantity, battery_level_upon_arrival, inserted_charge_quantity):
+        """a station visit is charged full when the same station is inserted right before or after it
+        :param charge_quantity: the charged quantity of the visit
+        :param battery_level_upon_arrival: the battery level upon arrival to the visit
+        :param inserted_charge_quantity: the quantity the inserted station would charge
+        :return: the new charge quantity of the visit"""
+        return self.data.battery_capacity - battery_level_upon_arrival
+
+    def repair_after_insert(self, route, loc, idx):
+        """recharges the existing stations of the route after an insertion
+        :param route: the route (or the evaluation of a move on it)
+        :param loc: location index of the insertion
+        :param idx: position index of the inserted location"""
+        route.recharge_last_station()
+
+    def inserted_station_charge_bound(self, route, idx, detours, battery_levels):
+        """Bounds the charge an inserted station adds to the route from above, for many stations and positions at once:
+        the inserted station charges the fixed quantity and afterwards either itself or one following station may be charged full,
+        the other charges can only decrease
+        :param route: the route
+        :param idx: position index of the insertion, or a NumPy column of position indices with a row of stations for each
+        :param detours: NumPy array of the changes in distance caused by the stations
+        :param battery_levels: NumPy array of the battery levels upon arrival to the stations
+        :return: NumPy array of the bounds"""
+        battery_space = self.data.battery_capacity - battery_levels
+        # a following station is charged full from at least its battery level upon departure less the energy of the detour,
+        # the largest of these charges from every position on
+        charged_full = np.full(len(route.visits) + 1, -np.inf)
+        for i, visit in enumerate(route.visits):
+            if self.data.type[visit.loc] == "f":
+                charged_full[i] = self.data.battery_capacity - visit.battery_level_upon_departure
+        following_charged_full = np.maximum.accumulate(charged_full[::-1])[::-1][idx]
+        additional_charge = np.maximum(0, following_charged_full + self.data.battery_consumption_rate * detours)
+        return np.maximum(battery_space, np.minimum(self.pr_strategy, battery_space) + additional_charge)
+
+
+def charging_policy(data):
+    """Chooses the charging policy according to the settings in config.py
+    :param data: data object of the current instance
+    :return: the charging policy of the routes"""
+    if config.BATTERY_DEGRADATION:
+        return BatteryDegradation(data)
+    if config.PR_FIXED:
+        return FixedPR(data)
+    return FreePR(data)
@@ -6,6 +6,19 @@ PR_FIXED = False
 # Change PR strategy here
 PR_STRATEGY = 0.4
 
+# Set True to redistribute the charges among the stations of a route with the least total recharge when recharging at the last station
+# does not make it battery feasible (before inserting a station), only for the free PR strategy without battery degradation.
+# Off by default: in 1000-iteration runs on 18 of the C10 and C15 instances it changed the best costs in both directions
+LEAST_RECHARGE = False
+
+# Set True to construct the initial solution without copying the route for every candidate insertion,
+# False for the original construction (slow on large instances),
+# both construct the same solution unless customers are equally far from the depot or give routes of equal distance
+FAST_INITIAL_SOLUTION = True
+
+# Set True to keep compiled instances (instance_cache/), so the excel files and the distances are only processed once
+CACHE_INSTANCES = True
+
 # set True if solving the EVRPTW-BD (extension), False if solving EVRPTW (without battery degradation considered)
 BATTERY_DEGRADATION = False
 W_L_costs = [0.1, 0.5, 2.5]
@@ -13,13 +26,34 @@ W_H_costs = [0.2, 1, 5]
 # change this accordingly
 price_idx = 2
 
-if BATTERY_DEGRADATION:
-    lb = 0.25
-    ub = 0.85
-    W_L = W_L_costs[price_idx]
-    W_H = W_H_costs[price_idx]
-else:
-    lb = 0
-    ub = 1
-    W_L = 0
-    W_H = 0
\ No newline at end of file
+
+
+def set_battery_degradation_parameters():
+    """sets the battery degradation related parameters according to BATTERY_DEGRADATION and price_idx"""
+    global lb, ub, W_L, W_H
+
+    if BATTERY_DEGRADATION:
+        lb = 0.25
+        ub = 0.85
+        W_L = W_L_costs[price_idx]
+        W_H = W_H_costs[price_idx]
+    else:
+        lb = 0
+        ub = 1
+        W_L = 0
+        W_H = 0
+
+
+def update(**settings):
+    """changes the configuration, the battery degradation related parameters that are not given are set again.
+    Some modules read it when they are imported (e.g. ALNS.py the number of iterations), so the configuration has to be changed before
+    :param settings: the names of the configuration variables and their new values"""
+    globals().update(settings)
+    set_battery_degradation_parameters()
+
+    for name in ("lb", "ub", "W_L", "W_H"):
+        if name in settings:
+            globals()[name] = settings[name]
+
+
+set_battery_degradation_parameters()
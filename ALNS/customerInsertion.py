@@ -1,14 +1,9 @@
 import copy
-import config
+import numpy as np
 import helper
+from insertionCostTable import InsertionCostTable
 from stationInsertion import greedy_station_insertion
-# Importing appropriate Route class version according to the settings in config.py
-if config.BATTERY_DEGRADATION:
-    from routeBD import Route
-elif config.PR_FIXED:
-    from routeFixedPR import Route
-else:
-    from route import Route
+from route import Route
 
 
 class CustomerInsertion:
@@ -27,6 +22,7 @@ class CustomerInsertion:
         self.scores = {}
         self.weights = {}
         self.times_used = {}
+        self.costs_table = InsertionCostTable()
 
         # All scores are initially set to 0 and the weights are equal
         for operation in self.operations:
@@ -41,14 +37,15 @@ class CustomerInsertion:
         :param removed: a set of customers to be inserted
         :return: the operation that was used and the solution after all insertions"""
         operation = self.choose_operation()
+        # insertion costs are kept between the insertions of this phase and only recalculated for changed routes
+        self.costs_table = InsertionCostTable()
 
         while len(removed) > 0:
             inserted, solution = operation(solution, removed)
             if inserted is None:
                 # No feasible insertion found, starting a new route...
-                new_route = Route(self.data)
                 inserted = self.data.find_closest(0, removed)
-                new_route.insert_at(inserted, 1)
+                new_route = Route.from_sequence(self.data, [inserted])
                 solution.add_route(new_route)
 
                 # Making new route battery feasible
@@ -56,7 +53,7 @@ class CustomerInsertion:
                     to_insert = greedy_station_insertion(self.data, new_route)
                     if to_insert is None:
                         break
-                    new_route.insert_at(*to_insert)
+                    solution.insert_at(new_route, *to_insert)
 
             removed.remove(inserted)
 
@@ -131,26 +128,7 @@ class CustomerInsertion:
         :return: location index of the customer that was inserted  and the solution after the insertion
         or None and solution as it was if no insertion is feasible in the currently existing routes"""
         def costs_func(solution, removed):
-            regret_costs = []
-
-            for loc in removed:
-                insertion_costs = []
-                for route_idx, route in enumerate(solution.routes):
-                    for i in range(1, len(route.visits)):
-                        cost = self.distance_costs(route, i, loc)
-                        insertion_costs.append((route_idx, loc, i, cost))
-                insertion_costs.sort(key=lambda x: x[3], reverse=False)
-
-                for i in range(len(insertion_costs)):
-                    route_idx, loc, i, cost = insertion_costs[i]
-
-                    if i + k - 1 < len(insertion_costs):
-                        cost -= insertion_costs[i + k - 1][3]
-
-                    regret_costs.append((route_idx, loc, i, cost))
-
-            regret_costs.sort(key=lambda x: x[3], reverse=True)
-            return regret_costs
+            return self.get_costs_table(self.distance_costs).regret_insertions(solution, removed, k)
 
         return self.insert_customer(solution, removed, costs_func)
 
@@ -166,7 +144,23 @@ class CustomerInsertion:
 
         for insertion in insertion_costs:
             route_idx, loc, idx, cost = insertion
-            copied_route = copy.deepcopy(solution.routes[route_idx])
+            route = solution.routes[route_idx]
+            if not route.can_insert(loc, idx) or not route.evaluate_insert(loc, idx, feasibility_only=True).is_feasible:
+                continue
+
+            evaluation = route.evaluate_insert(loc, idx)
+            if not evaluation.is_feasible:
+                continue
+
+            if evaluation.is_battery_feasible:
+                # no station has to be inserted, so the insertion is applied to the route of the solution directly
+                solution.insert_at(route, loc, idx)
+                self.costs_table.invalidate(route_idx)
+                inserted = loc
+                break
+
+            # the stations are inserted on a copy, as the route stays as it is if they cannot make it battery feasible
+            copied_route = copy.deepcopy(route)
             copied_route.insert_at(loc, idx)
 
             if copied_route.is_feasible:
@@ -177,34 +171,40 @@ class CustomerInsertion:
                     copied_route.insert_at(*to_insert)
 
             if copied_route.is_feasible and copied_route.is_battery_feasible:
-                solution.routes[route_idx] = copied_route
+                solution.replace_route(route_idx, copied_route)
+                self.costs_table.invalidate(route_idx)
                 inserted = loc
                 break
 
         return inserted, solution
 
-    def distance_costs(self, route, i, loc):
-        """Returns a distance cost of inserting customer loc in a given route at position i
+    def distance_costs(self, route, customers):
+        """Returns the distance costs of inserting every customer at every position of a given route
         :param: route: route of the insertion
-        :param: i: route position index of the location that would be inserted
-        :param: loc: location index of the location that would be inserted
-        :return the change in distance after the insertion"""
-        pred = route.visits[i - 1].loc
-        suc = route.visits[i].loc
-        return self.data.distance_matrix[pred, loc] + self.data.distance_matrix[loc, suc] - self.data.distance_matrix[pred, suc]
-
-    def time_costs(self, route, i, loc):
-        """Returns a time cost of inserting customer loc in a given route at position i
+        :param: customers: an array of location indices of the customers that would be inserted
+        :return a matrix of the changes in distance after the insertion, with a row per customer and a column per position 1, 2, ..."""
+        locs = np.array([visit.loc for visit in route.visits])
+        pred = locs[:-1]
+        suc = locs[1:]
+        distance_pred_to_loc = self.data.distance_matrix[np.ix_(pred, customers)].T
+        distance_loc_to_suc = self.data.distance_matrix[np.ix_(customers, suc)]
+        return distance_pred_to_loc + distance_loc_to_suc - self.data.distance_matrix[pred, suc]
+
+    def time_costs(self, route, customers):
+        """Returns the time costs of inserting every customer at every position of a given route
         :param: route: route of the insertion
-        :param: i: route position index of the location that would be inserted
-        :param: loc: location index of the location that would be inserted
-        :return the change in travel time after the insertion"""
-        pred = route.visits[i - 1]
-        suc = route.visits[i]
-        current_start_time = min(suc.arrival_time, self.data.ready_time[suc.loc])
-        travel_time = self.data.distance_matrix[pred.loc, loc] / self.data.velocity + self.data.distance_matrix[loc, suc.loc] / self.data.velocity
-        new_arrival_time = pred.departure_time + travel_time + self.data.service_time[loc]
-        new_start_time = min(new_arrival_time, self.data.ready_time[suc.loc])
+        :param: customers: an array of location indices of the customers that would be inserted
+        :return a matrix of the changes in travel time after the insertion, with a row per customer and a column per position 1, 2, ..."""
+        locs = np.array([visit.loc for visit in route.visits])
+        pred = locs[:-1]
+        suc = locs[1:]
+        pred_departure_time = np.array([visit.departure_time for visit in route.visits[:-1]])
+        suc_arrival_time = np.array([visit.arrival_time for visit in route.visits[1:]])
+        suc_ready_time = self.data.ready_time[suc]
+        current_start_time = np.minimum(suc_arrival_time, suc_ready_time)
+        travel_time = self.data.distance_matrix[np.ix_(pred, customers)].T / self.data.velocity + self.data.distance_matrix[np.ix_(customers, suc)] / self.data.velocity
+        new_arrival_time = pred_departure_time + travel_time + self.data.service_time[customers][:, np.newaxis]
+        new_start_time = np.minimum(new_arrival_time, suc_ready_time)
         return new_start_time - current_start_time
 
     def insertion_costs(self, solution, removed, costs_func, routes_to_consider=None):
@@ -215,22 +215,18 @@ class CustomerInsertion:
         :param costs_func: the function according to which insertion costs must be calculated
         :param routes_to_consider: a set of routes available for insertion
         or None if all routes can be considered
-        :return: a list of sorted insertion costs as tuples:
+        :return: an iterator over sorted insertion costs as tuples:
         (route idx of insertion, location idx of insertion, position in the route idx of insertion, the cost of insertion)"""
-        insertion_costs = []
-
-        for loc in removed:
-            for route_idx, route in enumerate(solution.routes):
-                if routes_to_consider is not None:
-                    if route_idx not in routes_to_consider:
-                        continue
+        return self.get_costs_table(costs_func).sorted_insertions(solution, removed, routes_to_consider)
 
-                for i in range(1, len(route.visits)):
-                    cost = costs_func(route, i, loc)
-                    insertion_costs.append((route_idx, loc, i, cost))
-
-        insertion_costs.sort(key=lambda x: x[3], reverse=False)
-        return insertion_costs
+    def get_costs_table(self, costs_func):
+        """Returns the insertion costs table of the current customer insertion phase,
+        a new table is started if the costs are calculated with a different function
+        :param costs_func: the function according to which insertion costs must be calculated
+        :return: the insertion costs table"""
+        if self.costs_table.costs_func != costs_func:
+            self.costs_table = InsertionCostTable(costs_func)
+        return self.costs_table
 
     def choose_operation(self):
         """Randomly chooses an operation with probability reflected by the weights
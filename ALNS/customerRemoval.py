@@ -53,12 +53,10 @@ class CustomerRemoval:
         :param solution: solution before removal
         :param n_c: number of customers to remove
         :return a set of removed customers"""
-        removed = []
-
-        for i in range(n_c):
-            selected_route, selected_visit = self.rnd.choice(solution.customer_visits)
-            selected_route.remove_visit(selected_visit)
-            removed.append(selected_visit.loc)
+        # the customers are drawn as random_visit would draw them one removal after the other
+        customers = [route.visits[i].loc for route in solution.routes for i in solution.visit_positions(route, "c")]
+        removed = [customers.pop(self.rnd.randrange(len(customers))) for i in range(n_c)]
+        solution.remove_customers(removed)
 
         return removed
 
@@ -159,9 +157,9 @@ class CustomerRemoval:
                 break
 
         for route, visit in zones[zone_to_remove]:
-            route.remove_visit(visit)
             removed.append(visit.loc)
 
+        solution.remove_customers(removed)
         return removed
 
     def random_route_removal(self, solution, n_c = 0):
@@ -179,7 +177,7 @@ class CustomerRemoval:
         :param n_c: set to 0 by default because not relevant
         :return a set of removed customers"""
         def greedy_selection(solution, n_routes_to_remove):
-            sorted_routes = sorted(solution.routes, key=lambda route: sum(self.data.type[visit.loc] == "c" for visit in route.visits))
+            sorted_routes = sorted(solution.routes, key=lambda route: len(solution.visit_positions(route, "c")))
             return sorted_routes[:n_routes_to_remove]
 
         return self.remove_route(solution, greedy_selection)
@@ -200,9 +198,9 @@ class CustomerRemoval:
         for i in range(n_c):
             removal_index = int(len(removal_costs) * (self.rnd.random() ** determinism_factor))
             to_remove = removal_costs.pop(removal_index)
-            to_remove[0].remove_visit(to_remove[1])
             removed.append(to_remove[1].loc)
 
+        solution.remove_customers(removed)
         return removed
 
     def shaw_costs_general(self, solution, shaw_param_1, shaw_param_2, shaw_param_3, shaw_param_4):
@@ -215,7 +213,7 @@ class CustomerRemoval:
         :return: a list of shaw removal costs for each location
         as a tuple of the route of the removal, the visit of the removal and the removal cost"""
         removal_costs = []
-        rnd_route, rnd_visit = self.rnd.choice(solution.customer_visits)
+        rnd_route, rnd_visit = solution.random_visit(self.rnd, "c")
 
         for route in solution.routes:
             for visit in route.visits:
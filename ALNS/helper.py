@@ -2,6 +2,9 @@ import math
 import json
 import numpy as np
 import config
+from locationVisit import FEASIBILITY_TOLERANCE
+from route import Route
+from solution import Solution
 
 
 def split_into_zones(data, solution):
@@ -33,6 +36,26 @@ def split_into_zones(data, solution):
 
     return zones
 
+def lazy_argsort(values, chunk_size=64):
+    """yields the indices of a NumPy array in ascending order of the values, equal values keep their order.
+    Only a chunk of the smallest values is selected with np.partition and sorted at a time, so the order is built as far as it is used
+    :param values: a one dimensional array
+    :param chunk_size: the number of values selected at a time
+    :return: a generator of the indices"""
+    remaining = np.arange(len(values))
+
+    while len(remaining) > 0:
+        if len(remaining) > chunk_size:
+            threshold = np.partition(values[remaining], chunk_size - 1)[chunk_size - 1]
+            in_chunk = values[remaining] <= threshold
+            chunk = remaining[in_chunk]
+            remaining = remaining[~in_chunk]
+        else:
+            chunk = remaining
+            remaining = remaining[:0]
+
+        yield from chunk[np.argsort(values[chunk], kind="stable")]
+
 def simulated_annealing(rnd, T, best, solution):
     """returns true if a solution is accepted according to simulated annealing
     :param rnd: random number generator
@@ -95,7 +118,7 @@ def check_feasibility(data, solution):
         for visit in route.visits:
             if data.type[visit.loc] == "c":
                 unvisited.remove(visit.loc)
-            if visit.arrival_time > data.due_time[visit.loc]:
+            if visit.arrival_time > data.due_time[visit.loc] + FEASIBILITY_TOLERANCE:
                 raise ValueError("Due time violated")
             if visit.load_level_upon_departure < 0:
                 raise ValueError("Load level violated")
@@ -141,4 +164,25 @@ def solution_to_JSON(solution, filename, time = 0.0):
     with open(file_path, 'w') as json_file:
         json.dump(solution_dict, json_file, indent=4)
 
+def solution_from_JSON(data, filename):
+    """loads a solution saved by solution_to_JSON, every route is built from its visits and charged quantities in one pass
+    :param data: data object of the instance the solution was obtained for
+    :param filename: file name the solution was saved to
+    :return: the loaded solution"""
+    if config.BATTERY_DEGRADATION:
+        file_path = "extension_solutions//" + filename + "_" + str(config.W_H) + ".json"
+    else:
+        file_path = "json_solutions//" + filename + "_PR" + str(config.PR_STRATEGY) + ".json"
+
+    with open(file_path, 'r') as json_file:
+        solution_dict = json.load(json_file)
+
+    solution = Solution(data)
+    for route_dict in solution_dict["Routes:"]:
+        locs = [visit_dict["Location:"] for visit_dict in route_dict["Visits:"]]
+        charges = [visit_dict["Charged quantity:"] for visit_dict in route_dict["Visits:"]]
+        solution.add_route(Route.from_sequence(data, locs[1:-1], charges))
+
+    return solution
+
 
@@ -1,25 +1,29 @@
 import copy
+import numpy as np
 import config
-# Importing appropriate Route class version according to the settings in config.py
-if config.BATTERY_DEGRADATION:
-    from routeBD import Route
-elif config.PR_FIXED:
-    from routeFixedPR import Route
-else:
-    from route import Route
+from route import Route
 from solution import Solution
 from stationInsertion import greedy_station_insertion
 
 
 def construct_initial_solution(data):
-    """constructs a feasible initial solution
+    """constructs a feasible initial solution, with the construction chosen in config.py
+    :param data: the instance data as a Reader object
+    :return: the constructed feasible solution"""
+    if config.FAST_INITIAL_SOLUTION:
+        return fast_initial_solution(data)
+    return greedy_initial_solution(data)
+
+
+def greedy_initial_solution(data):
+    """constructs a feasible initial solution by building one route at a time,
+    the insertion that gives the shortest route is found by inserting every customer at every position of a copy of the route
     :param data: the instance data as a Reader object
     :return: the constructed feasible solution"""
     solution = Solution(data)
     customers_to_serve = set(data.type_range("c"))
-    feasible_route = Route(data)
     next_to_insert = data.find_closest(0, customers_to_serve)
-    feasible_route.insert_at(next_to_insert, 1)
+    feasible_route = Route.from_sequence(data, [next_to_insert])
     customers_to_serve.remove(next_to_insert)
 
     while len(customers_to_serve) > 0:
@@ -44,10 +48,9 @@ def construct_initial_solution(data):
             current_customers_to_serve.remove(best_to_insert)
         else:
             solution.add_route(feasible_route)
-            feasible_route = Route(data)
             next_to_insert = data.find_closest(0, customers_to_serve)
             customers_to_serve.remove(next_to_insert)
-            feasible_route.insert_at(next_to_insert, 1)
+            feasible_route = Route.from_sequence(data, [next_to_insert])
             current_route = copy.deepcopy(feasible_route)
             current_customers_to_serve = copy.deepcopy(customers_to_serve)
 
@@ -59,10 +62,9 @@ def construct_initial_solution(data):
                 current_route.insert_at(*to_insert)
             if not current_route.is_battery_feasible or not current_route.is_feasible:
                 solution.add_route(feasible_route)
-                feasible_route = Route(data)
                 next_to_insert = data.find_closest(0, customers_to_serve)
                 customers_to_serve.remove(next_to_insert)
-                feasible_route.insert_at(next_to_insert, 1)
+                feasible_route = Route.from_sequence(data, [next_to_insert])
                 current_route = copy.deepcopy(feasible_route)
                 current_customers_to_serve = copy.deepcopy(customers_to_serve)
 
@@ -77,3 +79,89 @@ def construct_initial_solution(data):
 
     solution.add_route(feasible_route)
     return solution
+
+
+def fast_initial_solution(data):
+    """constructs the initial solution as greedy_initial_solution does, without copying the route for every candidate insertion:
+    the distances after all insertions are calculated at once and the candidates are evaluated in order of distance until one is feasible,
+    the route is only copied when an insertion needs stations that might not be found
+    :param data: the instance data as a Reader object
+    :return: the constructed feasible solution"""
+    solution = Solution(data)
+    customers_to_serve = set(data.type_range("c"))
+    next_to_insert = data.find_closest(0, customers_to_serve)
+    feasible_route = Route.from_sequence(data, [next_to_insert])
+    customers_to_serve.remove(next_to_insert)
+
+    while len(customers_to_serve) > 0:
+        best_insertion = shortest_feasible_insertion(data, feasible_route, customers_to_serve)
+
+        if best_insertion is not None:
+            customer, idx = best_insertion
+            if feasible_route.evaluate_insert(customer, idx).is_battery_feasible:
+                feasible_route.insert_at(customer, idx)
+                customers_to_serve.remove(customer)
+                continue
+
+            current_route = copy.deepcopy(feasible_route)
+            current_route.insert_at(customer, idx)
+        else:
+            solution.add_route(feasible_route)
+            next_to_insert = data.find_closest(0, customers_to_serve)
+            customers_to_serve.remove(next_to_insert)
+            feasible_route = Route.from_sequence(data, [next_to_insert])
+            if feasible_route.is_battery_feasible:
+                continue
+
+            customer = None
+            current_route = copy.deepcopy(feasible_route)
+
+        # the current route needs stations, if they cannot be inserted the last feasible route is finished
+        while current_route.is_feasible and not current_route.is_battery_feasible:
+            to_insert = greedy_station_insertion(data, current_route)
+            if to_insert is None:
+                break
+            current_route.insert_at(*to_insert)
+
+        if not current_route.is_battery_feasible or not current_route.is_feasible:
+            solution.add_route(feasible_route)
+            next_to_insert = data.find_closest(0, customers_to_serve)
+            customers_to_serve.remove(next_to_insert)
+            current_route = Route.from_sequence(data, [next_to_insert])
+
+            while current_route.is_feasible and not current_route.is_battery_feasible:
+                to_insert = greedy_station_insertion(data, current_route)
+                if to_insert is None:
+                    break
+                current_route.insert_at(*to_insert)
+        elif customer is not None:
+            customers_to_serve.remove(customer)
+
+        feasible_route = current_route
+
+    solution.add_route(feasible_route)
+    return solution
+
+
+def shortest_feasible_insertion(data, route, customers):
+    """finds the insertion of a customer into the route that gives the shortest feasible route,
+    of insertions giving the same distance the one at the earliest position is chosen
+    :param data: the instance data as a Reader object
+    :param route: the route under construction
+    :param customers: a set of location indices of the customers that are not served yet
+    :return: the customer and the position index of the insertion, or None if no insertion is feasible"""
+    customers = np.array(list(customers))
+    locs = np.array([visit.loc for visit in route.visits])
+    pred = locs[:-1]
+    suc = locs[1:]
+    # distances of the route after inserting every customer at every position, a row per position 1, 2, ... and a column per customer
+    distances = route.distance + (data.distance_matrix[np.ix_(pred, customers)] + data.distance_matrix[np.ix_(customers, suc)].T
+                                  - data.distance_matrix[pred, suc][:, np.newaxis])
+
+    for candidate in np.argsort(distances, axis=None, kind="stable"):
+        position, customer_idx = divmod(int(candidate), len(customers))
+        customer = int(customers[customer_idx])
+        if route.can_insert(customer, position + 1) and route.evaluate_insert(customer, position + 1, feasibility_only=True).is_feasible:
+            return customer, position + 1
+
+    return None
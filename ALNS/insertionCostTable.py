@@ -0,0 +1,165 @@
+import math
+import numpy as np
+import helper
+
+
+class InsertionCostTable:
+    """Insertion costs of the removed customers that are kept during one customer insertion phase.
+    The costs are stored as a matrix per route (a row per customer, a column per position),
+    so after an insertion only the costs of the changed route are recalculated"""
+    def __init__(self, costs_func=None):
+        """Initializes an empty table
+        :param costs_func: the function according to which insertion costs are calculated,
+        it takes the route and an array of customers and returns the matrix of their insertion costs"""
+        self.costs_func = costs_func
+        self.customers = np.zeros(0, dtype=int)
+        # customer -> row of the customer in the cost matrices
+        self.rows = {}
+        # route idx -> matrix of the insertion costs of all customers in the table
+        self.route_costs = {}
+        # k -> route idx -> the k cheapest insertion costs of each customer in the route, in ascending order
+        self.route_best = {}
+        # k -> the k cheapest insertion costs of each customer over all routes in ascending order, and the routes they come from
+        self.best_costs = {}
+        self.best_routes = {}
+        # k -> routes changed since the cheapest insertion costs were updated
+        self.changed_routes = {}
+
+    def invalidate(self, route_idx):
+        """Forgets the insertion costs of a route that was changed
+        :param route_idx: index of the changed route in the solution"""
+        self.route_costs.pop(route_idx, None)
+        for k in self.route_best:
+            self.route_best[k].pop(route_idx, None)
+            self.changed_routes[k].add(route_idx)
+
+    def get_rows(self, removed):
+        """Returns the rows of the removed customers, the table is restarted if some customer is not in it yet
+        :param removed: a list of customers that need to be inserted
+        :return: an array of the row indices in the order of removed"""
+        if any(loc not in self.rows for loc in removed):
+            self.customers = np.array(removed, dtype=int)
+            self.rows = {loc: row for row, loc in enumerate(removed)}
+            self.route_costs.clear()
+            self.route_best.clear()
+            self.best_costs.clear()
+            self.best_routes.clear()
+            self.changed_routes.clear()
+
+        return np.array([self.rows[loc] for loc in removed], dtype=int)
+
+    def costs(self, solution, route_idx):
+        """Returns the insertion costs of all customers in the table in all positions of a route, calculating them if they are not known
+        :param solution: the current solution
+        :param route_idx: index of the route in the solution
+        :return: the matrix of the costs, with a row per customer and a column per position 1, 2, ..."""
+        if route_idx not in self.route_costs:
+            self.route_costs[route_idx] = self.costs_func(solution.routes[route_idx], self.customers)
+        return self.route_costs[route_idx]
+
+    def cost_matrix(self, solution, rows, route_indices):
+        """Puts the costs of the given customers in the given routes side by side
+        :param solution: the current solution
+        :param rows: the rows of the customers
+        :param route_indices: the indices of the routes
+        :return: the matrix of the costs with a row per customer and a column per route and position,
+        the route index of every column and the position index of every column"""
+        matrices = [self.costs(solution, route_idx)[rows] for route_idx in route_indices]
+
+        if len(matrices) == 0:
+            return np.zeros((len(rows), 0)), np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+        column_routes = np.concatenate([np.full(matrix.shape[1], route_idx) for route_idx, matrix in zip(route_indices, matrices)])
+        column_positions = np.concatenate([np.arange(1, matrix.shape[1] + 1) for matrix in matrices])
+        return np.concatenate(matrices, axis=1), column_routes, column_positions
+
+    def sorted_insertions(self, solution, removed, routes_to_consider=None):
+        """Yields the insertion costs of all removed customers in all routes in ascending order of the costs,
+        only the part of the order that is used is sorted. Ties keep the order of the customers in removed, then of the routes, then of the positions
+        :param solution: the current solution
+        :param removed: a list of customers that need to be inserted
+        :param routes_to_consider: a set of route indices available for insertion or None if all routes can be considered
+        :return: a generator of the insertion costs as tuples:
+        (route idx of insertion, location idx of insertion, position in the route idx of insertion, the cost of insertion)"""
+        route_indices = [route_idx for route_idx in range(len(solution.routes)) if routes_to_consider is None or route_idx in routes_to_consider]
+        matrix, column_routes, column_positions = self.cost_matrix(solution, self.get_rows(removed), route_indices)
+        costs = matrix.ravel()
+        n_columns = matrix.shape[1]
+
+        for i in helper.lazy_argsort(costs):
+            row, column = divmod(int(i), n_columns)
+            yield int(column_routes[column]), removed[row], int(column_positions[column]), costs[i]
+
+    def regret_insertions(self, solution, removed, k):
+        """Orders the customers from the largest to the smallest regret: the difference between their k-th cheapest and their cheapest insertion cost
+        (infinite for customers with less than k insertion possibilities). The insertions of each customer are in ascending order of the costs
+        :param solution: the current solution
+        :param removed: a list of customers that need to be inserted
+        :param k: 2 for regret-2, 3 for regret-3
+        :return: a generator of the insertion costs tuples"""
+        rows = self.get_rows(removed)
+        best_costs = self.cheapest_costs(solution, k)
+
+        if sum(self.costs(solution, route_idx).shape[1] for route_idx in range(len(solution.routes))) < k:
+            regrets = np.full(len(self.customers), math.inf)
+        else:
+            regrets = best_costs[:, k - 1] - best_costs[:, 0]
+
+        for i in helper.lazy_argsort(-regrets[rows]):
+            yield from self.sorted_insertions(solution, [removed[i]])
+
+    def cheapest_costs(self, solution, k):
+        """Returns the k cheapest insertion costs of every customer in the table over all routes, updated for the routes changed since the last call:
+        customers with one of these costs in a changed route take them again from the k cheapest costs of every route,
+        the other customers only compare them with the new costs of the changed routes
+        :param solution: the current solution
+        :param k: the number of costs kept per customer
+        :return: the matrix of the costs in ascending order, with a row per customer and k columns (infinite if there are less than k insertions)"""
+        if k not in self.best_costs:
+            self.route_best[k] = {}
+            self.best_costs[k] = np.full((len(self.customers), k), math.inf)
+            self.best_routes[k] = np.full((len(self.customers), k), -1)
+            self.changed_routes[k] = set()
+
+        route_best = self.route_best[k]
+        # routes added to the solution since the last call are changed as well
+        changed_routes = sorted(self.changed_routes[k] | {route_idx for route_idx in range(len(solution.routes)) if route_idx not in route_best})
+        self.changed_routes[k] = set()
+        if len(changed_routes) == 0:
+            return self.best_costs[k]
+
+        for route_idx in changed_routes:
+            costs = self.costs(solution, route_idx)
+            if costs.shape[1] > k:
+                costs = np.partition(costs, k - 1, axis=1)[:, :k]
+            costs = np.sort(costs, axis=1)
+            padding = np.full((len(self.customers), k - costs.shape[1]), math.inf)
+            route_best[route_idx] = np.concatenate((costs, padding), axis=1)
+
+        best_costs = self.best_costs[k]
+        best_routes = self.best_routes[k]
+        stale = np.isin(best_routes, changed_routes).any(axis=1)
+
+        # customers that lost some of their cheapest costs take them from all routes again
+        route_indices = sorted(route_best)
+        candidate_costs = np.concatenate([route_best[route_idx][stale] for route_idx in route_indices], axis=1)
+        candidate_routes = np.repeat(route_indices, k)[np.newaxis, :].repeat(len(candidate_costs), axis=0)
+        best_costs[stale], best_routes[stale] = self.cheapest(candidate_costs, candidate_routes, k)
+
+        # the other customers keep their cheapest costs unless a changed route now has cheaper ones
+        for route_idx in changed_routes:
+            candidate_costs = np.concatenate((best_costs[~stale], route_best[route_idx][~stale]), axis=1)
+            candidate_routes = np.concatenate((best_routes[~stale], np.full((len(candidate_costs), k), route_idx)), axis=1)
+            best_costs[~stale], best_routes[~stale] = self.cheapest(candidate_costs, candidate_routes, k)
+
+        return best_costs
+
+    @staticmethod
+    def cheapest(costs, routes, k):
+        """Selects the k cheapest costs of every row
+        :param costs: a matrix of costs
+        :param routes: the routes of the costs
+        :param k: the number of costs to select per row
+        :return: the selected costs in ascending order and their routes"""
+        order = np.argsort(costs, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(costs, order, axis=1), np.take_along_axis(routes, order, axis=1)
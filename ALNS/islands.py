@@ -0,0 +1,113 @@
+import time
+import random
+import multiprocessing
+
+import config
+
+# ALNS and the modules it uses are only imported inside the functions: they read the configuration when they are imported,
+# so every process changes the configuration first
+
+
+def island(connection, file, seed, settings):
+    """runs one ALNS trajectory in its own process, in epochs requested by the coordinator.
+    The coordinator sends (number of iterations, elite solution or None, weights or None) to start an epoch
+    and gets back (best solution of the island, weights of the island), it sends None to stop the island
+    :param connection: the end of the pipe to the coordinator
+    :param file: the name of the instance file
+    :param seed: the seed of the RND of this island
+    :param settings: the configuration of the run, names of the variables in config and their values"""
+    config.update(**settings)
+    import ALNS
+    from reader import get_reader
+
+    data = get_reader("evrptw_instances//" + file + ".xlsx")
+    rnd = random.Random()
+    rnd.seed(seed)
+    search = ALNS.Search(data, rnd)
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+
+        n_iterations, elite_solution, weights = message
+        if elite_solution is not None:
+            search.restart(elite_solution, weights)
+
+        search.iterate(n_iterations, verbose=False)
+        connection.send((search.best_solution, search.get_weights()))
+
+    connection.close()
+
+
+def average_weights(all_weights):
+    """averages the weights of the operations over the islands
+    :param all_weights: a list with the weights of every island, as given by Search.get_weights
+    :return: the average weights in the same format"""
+    return [[sum(weights) / len(weights) for weights in zip(*type_weights)] for type_weights in zip(*all_weights)]
+
+
+def run_islands(file, seeds, time_budget, migration_interval=None, settings=None):
+    """runs an ALNS trajectory per seed in parallel, every migration_interval iterations the best solution of all islands
+    and the average weights of the operations are sent to all islands, which continue from that elite solution.
+    Migrations continue until the time budget is used, so the last epoch may end a bit later.
+    The best solution is checked and saved to a json file as in ALNS.py, with "_islands" added to the instance name
+    :param file: the name of the instance file
+    :param seeds: the seeds of the islands, one process is started per seed
+    :param time_budget: the wall-clock time in seconds after which no new epoch is started
+    :param migration_interval: the number of iterations of an epoch, N_C of ALNS.py by default
+    :param settings: the configuration of the run, names of the variables in config and their values
+    :return: the best solution found and the time it took in seconds"""
+    settings = settings or {}
+    config.update(**settings)
+    import ALNS
+    import helper
+    from reader import get_reader
+
+    start_time = time.time()
+    migration_interval = migration_interval or ALNS.N_C
+    # the solutions received from the islands refer to this Reader
+    data = get_reader("evrptw_instances//" + file + ".xlsx")
+    context = multiprocessing.get_context("spawn")
+    connections = []
+    processes = []
+
+    for seed in seeds:
+        connection, island_connection = context.Pipe()
+        process = context.Process(target=island, args=(island_connection, file, seed, settings))
+        process.start()
+        island_connection.close()
+        connections.append(connection)
+        processes.append(process)
+
+    best_solution = None
+    elite_solution = None
+    weights = None
+    epoch = 0
+
+    while time.time() - start_time < time_budget:
+        for connection in connections:
+            connection.send((migration_interval, elite_solution, weights))
+
+        results = [connection.recv() for connection in connections]
+        elite_solution = min((solution for solution, _ in results), key=lambda solution: solution.total_cost)
+        weights = average_weights([island_weights for _, island_weights in results])
+        epoch += 1
+
+        if best_solution is None or elite_solution.total_cost < best_solution.total_cost:
+            best_solution = elite_solution
+
+        print(f"epoch {epoch}: best cost {best_solution.total_cost:.2f}, {time.time() - start_time:.1f} s since the start")
+
+    for connection, process in zip(connections, processes):
+        connection.send(None)
+        process.join()
+
+    elapsed_time = time.time() - start_time
+    helper.check_feasibility(data, best_solution)
+    helper.solution_to_JSON(best_solution, file + "_islands", elapsed_time)
+    return best_solution, elapsed_time
+
+
+if __name__ == "__main__":
+    run_islands("c101_21", seeds=range(78, 78 + multiprocessing.cpu_count()), time_budget=3600)
@@ -1,12 +1,23 @@
 import math
-import config
+
+# times are sums of floats that the routes, the move evaluations and the bounds of the station insertions add up in different orders,
+# so a due time is only taken as violated when the arrival misses it by more than this tolerance
+FEASIBILITY_TOLERANCE = 1e-9
 
 
 class LocationVisit:
-    """Location visit objects that track time and vehicle state"""
-    def __init__(self, data, loc, arrival_time, load_level_upon_arrival, battery_level_upon_arrival, charge_quantity=0):
+    """Location visit objects that track time and vehicle state
+    the attributes of the location are kept as plain Python values and the values derived from the vehicle state
+    (departure time, charged quantity, battery level upon departure and battery degradation cost) are only recalculated
+    when the state changes, so reading them is a plain attribute access"""
+    __slots__ = ("data", "loc", "demand", "ready_time", "due_time", "service_time", "is_customer",
+                 "has_battery_degradation_cost", "arrival_time", "load_level_upon_departure", "battery_level_upon_arrival", "_charge_quantity",
+                 "_charged_quantity", "departure_time", "battery_level_upon_departure", "battery_degradation_cost")
+
+    def __init__(self, data, policy, loc, arrival_time, load_level_upon_arrival, battery_level_upon_arrival, charge_quantity=0):
         """Initializes a new location visit
         :param data: data object of the current instance
+        :param policy: the charging policy of the route, it tells if battery degradation is considered
         :param loc: location index
         :param arrival_time: arrival time to the location in minutes
         :param load_level_upon_arrival: load level when vehicle arrives
@@ -14,37 +25,76 @@ class LocationVisit:
         :param charge_quantity: charged quantity at the location (default value 0)"""
         self.data = data
         self.loc = loc
+        self.demand, self.ready_time, self.due_time, self.service_time, self.is_customer = data.visit_attributes[loc]
+        self.has_battery_degradation_cost = policy.battery_degradation and not self.is_customer
         self.arrival_time = arrival_time
         self.battery_level_upon_arrival = battery_level_upon_arrival
-        self.load_level_upon_departure = load_level_upon_arrival - self.data.demand[self.loc]
+        self.load_level_upon_departure = load_level_upon_arrival - self.demand
         self._charge_quantity = charge_quantity
-
-    @property
-    def departure_time(self):
-        """gets updated departure time"""
-        if self.arrival_time < self.data.ready_time[self.loc]:
-            start_time = self.data.ready_time[self.loc]
+        self.refresh()
+
+    def __deepcopy__(self, memo):
+        """a deep copy of a visit is the same as copy
+        :param memo: the deepcopy memo"""
+        return self.copy()
+
+    def copy(self):
+        """the attributes of a visit are immutable values and the shared instance data,
+        so a copy of the visit only copies the slots, which are assigned one by one as the move evaluations copy many visits
+        :return: the copied visit"""
+        copied_visit = LocationVisit.__new__(LocationVisit)
+        copied_visit.data = self.data
+        copied_visit.loc = self.loc
+        copied_visit.demand = self.demand
+        copied_visit.ready_time = self.ready_time
+        copied_visit.due_time = self.due_time
+        copied_visit.service_time = self.service_time
+        copied_visit.is_customer = self.is_customer
+        copied_visit.has_battery_degradation_cost = self.has_battery_degradation_cost
+        copied_visit.arrival_time = self.arrival_time
+        copied_visit.load_level_upon_departure = self.load_level_upon_departure
+        copied_visit.battery_level_upon_arrival = self.battery_level_upon_arrival
+        copied_visit._charge_quantity = self._charge_quantity
+        copied_visit._charged_quantity = self._charged_quantity
+        copied_visit.departure_time = self.departure_time
+        copied_visit.battery_level_upon_departure = self.battery_level_upon_departure
+        copied_visit.battery_degradation_cost = self.battery_degradation_cost
+        return copied_visit
+
+    def refresh(self):
+        """recalculates the values derived from arrival time, battery level upon arrival and charged quantity"""
+        charged_quantity = min(self._charge_quantity, self.data.battery_capacity - self.battery_level_upon_arrival)
+        self._charged_quantity = charged_quantity
+
+        if self.arrival_time < self.ready_time:
+            start_time = self.ready_time
         else:
             start_time = self.arrival_time
 
-        return start_time + self.data.service_time[self.loc] + self.data.recharging_rate * self.charge_quantity
+        self.departure_time = start_time + self.service_time + self.data.recharging_rate * charged_quantity
+        self.battery_level_upon_departure = self.battery_level_upon_arrival + charged_quantity
 
-    @property
-    def battery_level_upon_departure(self):
-        """gets updated battery level upon departure"""
-        return self.battery_level_upon_arrival + self.charge_quantity
+        # Only for extension
+        # cost of battery degradation considering the battery level on arrival and departure,
+        # 0 if the costs are not considered by the charging policy or if location is a customer
+        if not self.has_battery_degradation_cost:
+            self.battery_degradation_cost = 0
+        else:
+            under_LB = self.data.W_L * max(0, (self.data.LB - self.battery_level_upon_arrival))
+            over_UB = self.data.W_H * max(0, self.battery_level_upon_departure - self.data.UB)
+            self.battery_degradation_cost = under_LB + over_UB
 
     @property
     def charge_quantity(self):
         """forbids the charged amount exceed batteries capacity"""
-        return min(self._charge_quantity, self.data.battery_capacity - self.battery_level_upon_arrival)
+        return self._charged_quantity
 
     @charge_quantity.setter
     def charge_quantity(self, charge_quantity):
         """Charging is not allowed at customer locations
         charged quantity must be positive
         any attempted charge above batteries capacity will be reduced"""
-        if charge_quantity > 0 and self.data.type[self.loc] == "c":
+        if charge_quantity > 0 and self.is_customer:
             raise ValueError("Cannot charge at customer locations")
 
         if charge_quantity < 0 and not math.isclose(charge_quantity, 0, abs_tol=1e-9):
@@ -53,23 +103,12 @@ class LocationVisit:
         charge_quantity = min(charge_quantity, self.data.battery_capacity - self.battery_level_upon_arrival)
 
         self._charge_quantity = charge_quantity
-
-    # Only for extension
-    @property
-    def battery_degradation_cost(self):
-        """Returns the cost of battery degradation by considering the battery level on arrival and departure
-         or 0 if the costs are not considered or if location is a customer"""
-        if not config.BATTERY_DEGRADATION or self.data.type[self.loc] == "c":
-            return 0
-        else:
-            under_LB = self.data.W_L * max(0, (self.data.LB - self.battery_level_upon_arrival))
-            over_UB = self.data.W_H * max(0, self.battery_level_upon_departure - self.data.UB)
-            return under_LB + over_UB
+        self.refresh()
 
     @property
     def is_feasible(self):
         """visit is feasible if due time and vehicle load are not violated"""
-        if self.arrival_time > self.data.due_time[self.loc]:
+        if self.arrival_time > self.due_time + FEASIBILITY_TOLERANCE:
             return False
         if self.load_level_upon_departure < 0:
             return False
@@ -83,7 +122,7 @@ class LocationVisit:
 
     def update(self, new_arrival_time, load_level_difference, new_battery_level):
         """updates attributes: arrival time, load level upon departure, battery level upon arrival
-        all other characteristics are properties and will be updated once accessed
+        the derived values are recalculated
         :param new_arrival_time: new time of arrival
         :param load_level_difference: increase (positive) or decrease (negative) in load level on arrival:
         :param new_battery_level: new battery level upon arrival
@@ -91,18 +130,18 @@ class LocationVisit:
         self.arrival_time = new_arrival_time
         self.load_level_upon_departure += load_level_difference
         self.battery_level_upon_arrival = new_battery_level
-        self._charge_quantity = min(self._charge_quantity, self.data.battery_capacity - self.battery_level_upon_arrival)
-
+        self.refresh()
+        self._charge_quantity = self._charged_quantity
 
     def print(self):
         """Prints all relevant information on this visit"""
         print(f"{self.loc}:")
         print(f"feasible? {self.is_feasible}")
         print(f"is battery feasible? {self.is_battery_feasible}")
-        print(f"time window: [{self.data.ready_time[self.loc]} - {self.data.due_time[self.loc]}]")
-        print(f"demand: {self.data.demand[self.loc]}")
+        print(f"time window: [{self.ready_time} - {self.due_time}]")
+        print(f"demand: {self.demand}")
         print(
-            f"arrived: {self.arrival_time} (service: +{self.data.service_time[self.loc]} charging +{self.data.recharging_rate * self.charge_quantity}) - departure: {self.departure_time}")
+            f"arrived: {self.arrival_time} (service: +{self.service_time} charging +{self.data.recharging_rate * self.charge_quantity}) - departure: {self.departure_time}")
         print(f"vehicle load: {self.load_level_upon_departure}")
         print(
             f"battery level: {self.battery_level_upon_arrival} (charged: +{self.charge_quantity})  - {self.battery_level_upon_departure}")
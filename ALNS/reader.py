@@ -1,34 +1,118 @@
 import numpy as np
 import pandas as pd
+import hashlib
 import math
+import os
 import config
 
+# directory next to the directory of the instances where the compiled instances are kept
+CACHE_DIRECTORY = "instance_cache"
+# change when the arrays stored in the cache change, so the old cache files are not used
+CACHE_VERSION = 1
+# absolute path of the excel file -> Reader of the instance, so that the instance is read once per process
+readers = {}
+
 class Reader:
+    """Instance data shared by all routes and visits
+    the data is never altered after reading, so copies of routes and solutions keep referring to the same object"""
+    # instance data stored in the compiled instance
+    ARRAYS = ("type", "x", "y", "demand", "ready_time", "due_time", "service_time",
+              "distance_matrix", "ranked_stations", "station_detours", "station_energy")
+    SCALARS = ("battery_capacity", "load_capacity", "battery_consumption_rate", "recharging_rate", "velocity")
+
     def __init__(self, path):
-        """initializes all instance data
+        """initializes all instance data, from the compiled instance if the excel file was compiled before
+        :param path: path to the excel file"""
+        self.path = os.path.abspath(path)
+        cache_path = get_cache_path(path) if config.CACHE_INSTANCES else None
+        compiled = cache_path is not None and os.path.exists(cache_path)
+
+        if compiled:
+            self.load(cache_path)
+        else:
+            self.read_excel(path)
+
+        # arithmetic on single NumPy values is slow, so the scalars are kept as plain Python numbers
+        for name in self.SCALARS:
+            setattr(self, name, getattr(self, name).item())
+
+        self.n = len(self.type)
+        self.n_service = self.number_of_service_points()
+        self.n_customer = self.n - self.n_service - 1
+
+        if not compiled:
+            self.distance_matrix = self.get_distance_matrix()
+            self.ranked_stations, self.station_detours, self.station_energy = self.get_station_detours()
+            if cache_path is not None:
+                self.save(cache_path)
+
+        self.LB = config.lb*self.battery_capacity
+        self.UB = config.ub*self.battery_capacity
+        self.W_L = config.W_L
+        self.W_H = config.W_H
+
+        for name in self.ARRAYS:
+            getattr(self, name).flags.writeable = False
+
+        # demand, ready time, due time, service time and whether the location is a customer as plain Python values,
+        # visits look these up once instead of indexing the arrays on every update
+        self.visit_attributes = list(zip(self.demand.tolist(), self.ready_time.tolist(), self.due_time.tolist(),
+                                         self.service_time.tolist(), (self.type == "c").tolist()))
+
+        readers.setdefault(self.path, self)
+
+    def read_excel(self, path):
+        """reads the instance data given in the excel file
         :param path: path to the excel file"""
         df = pd.read_excel(path, "locations")
         other = pd.read_excel(path, "other")
-        self.type = df['Type'].values
+        self.type = np.array(df['Type'], dtype=str)
         self.x = df['x'].values
         self.y = df['y'].values
         self.demand = df['demand'].values
         self.ready_time = df['ReadyTime'].values
         self.due_time = df['DueDate'].values
         self.service_time = df['ServiceTime'].values
-        self.n = len(self.type)
-        self.n_service = self.number_of_service_points()
-        self.n_customer = self.n - self.n_service - 1
         self.battery_capacity = other['Q'][0]
         self.load_capacity = other['C'][0]
         self.battery_consumption_rate = other['r'][0]
         self.recharging_rate = other['g'][0]
         self.velocity = other['v'][0]
-        self.distance_matrix = self.get_distance_matrix()
-        self.LB = config.lb*self.battery_capacity
-        self.UB = config.ub*self.battery_capacity
-        self.W_L = config.W_L
-        self.W_H = config.W_H
+
+    def load(self, cache_path):
+        """reads the instance data from the compiled instance
+        :param cache_path: path to the compiled instance"""
+        with np.load(cache_path) as compiled:
+            for name in self.ARRAYS:
+                setattr(self, name, compiled[name])
+            for name in self.SCALARS:
+                setattr(self, name, compiled[name][()])
+
+    def save(self, cache_path):
+        """stores the instance data as a compiled instance,
+        the file is written under a temporary name first, so a run reading the same instance never sees half of it
+        :param cache_path: path to the compiled instance"""
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+
+        with open(temporary_path, "wb") as file:
+            np.savez(file, **{name: getattr(self, name) for name in self.ARRAYS + self.SCALARS})
+
+        os.replace(temporary_path, cache_path)
+
+    def __copy__(self):
+        """instance data is immutable, so it is shared instead of copied"""
+        return self
+
+    def __deepcopy__(self, memo):
+        """instance data is immutable, so deep copies of routes and visits share it instead of copying it
+        :param memo: the deepcopy memo"""
+        return self
+
+    def __reduce__(self):
+        """pickled instance data (e.g. in a solution sent to another process) only consists of the path,
+        the receiving process reads the instance once and shares it between all unpickled solutions"""
+        return get_reader, (self.path,)
 
     def number_of_service_points(self):
         """calculates how many service points the instance has
@@ -53,13 +137,24 @@ class Reader:
     def get_distance_matrix(self):
         """constructs a distance matrix, where i,j th element is
         the distance between locations i and j"""
-        distances = np.zeros((self.n, self.n))
+        x_differences = self.x[:, np.newaxis] - self.x[np.newaxis, :]
+        y_differences = self.y[:, np.newaxis] - self.y[np.newaxis, :]
+        return np.sqrt(x_differences ** 2 + y_differences ** 2).astype(float)
 
-        for i in range(self.n):
-            for j in range(self.n):
-                distances[i, j] = self.distance_between(i, j)
-
-        return distances
+    def get_station_detours(self):
+        """ranks the stations for every ordered pair of locations i, j by the detour of visiting the station in between,
+        d(i, s) + d(s, j) - d(i, j), equal detours keep the order of the station indices
+        :return: three arrays where i, j, k th element is about the k th cheapest station between locations i and j:
+        the location index of the station, its detour and the energy needed to reach it from i"""
+        stations = np.array(self.type_range("f"), dtype=int)
+        to_station = self.distance_matrix[:, stations]
+        from_station = self.distance_matrix[stations, :].T
+        detours = to_station[:, np.newaxis, :] + from_station[np.newaxis, :, :] - self.distance_matrix[:, :, np.newaxis]
+        ranking = np.argsort(detours, axis=2, kind="stable")
+        ranked_stations = stations[ranking]
+        station_detours = np.take_along_axis(detours, ranking, axis=2)
+        station_energy = self.battery_consumption_rate * np.take_along_axis(np.broadcast_to(to_station[:, np.newaxis, :], detours.shape), ranking, axis=2)
+        return ranked_stations, station_detours, station_energy
 
     def type_range(self, type="all"):
         """Gives the range of indexes for customers, sources or both, if not specified
@@ -94,4 +189,23 @@ class Reader:
         return closest_loc
 
 
+def get_cache_path(path):
+    """gives the path of the compiled instance of an excel file, named by a hash of the file content,
+    so a changed instance file is compiled again
+    :param path: path to the excel file
+    :return: path to the compiled instance"""
+    with open(path, "rb") as file:
+        content_hash = hashlib.sha1(file.read() + str(CACHE_VERSION).encode()).hexdigest()[:16]
+
+    instance_directory = os.path.dirname(os.path.abspath(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(instance_directory), CACHE_DIRECTORY, f"{name}-{content_hash}.npz")
+
 
+def get_reader(path):
+    """gives the Reader of an instance, the instance is only read if it was not read by this process before
+    :param path: path to the excel file
+    :return: the Reader of the instance"""
+    if os.path.abspath(path) not in readers:
+        Reader(path)
+    return readers[os.path.abspath(path)]
@@ -1,17 +1,61 @@
-from locationVisit import LocationVisit
-import copy
+from locationVisit import LocationVisit, FEASIBILITY_TOLERANCE
+from chargingOptimization import least_recharge_quantities
+from chargingPolicy import charging_policy
+import math
+import numpy as np
 
 class Route:
-    """Route objects that track all location visits in order"""
-    def __init__(self, data):
+    """Route objects that track all location visits in order,
+    the rules of charging and the battery bounds of the problem variant are given by the charging policy (chargingPolicy.py)"""
+    def __init__(self, data, policy=None):
         """Initializes an empty route that only has mandatory visits to the depot
-        :param data: data object of the current instance"""
+        :param data: data object of the current instance
+        :param policy: the charging policy, chosen according to the settings in config.py by default"""
         self.data = data
+        self.policy = policy if policy is not None else charging_policy(data)
         self.visits = []
         self.distance = 0
-        self.battery_degradation_costs = 0
-        self.visits.append(LocationVisit(data, 0, 0, data.load_capacity, data.battery_capacity))
-        self.visits.append(LocationVisit(data, 0, 0, data.load_capacity, data.battery_capacity))
+        self._forward_time_slack = None
+        self.visits.append(LocationVisit(data, self.policy, 0, 0, data.load_capacity, self.policy.initial_battery_level))
+        self.visits.append(LocationVisit(data, self.policy, 0, 0, data.load_capacity, self.policy.initial_battery_level))
+        # the sum of the battery degradation costs of the visits, adjusted by the change whenever the cost of a station or depot visit changes
+        self._battery_degradation_costs = self.sum_battery_degradation_costs()
+
+    @classmethod
+    def from_sequence(cls, data, locs, charges=None):
+        """Builds the route that visits the locations in the given order
+        :param data: data object of the current instance
+        :param locs: location indices of the visits between the two depot visits
+        :param charges: the charged quantities at all visits including the two depot visits, any charge above the battery capacity is reduced,
+        or None to charge as inserting the locations one after another at the end of the route does
+        :return: the new route"""
+        route = cls(data)
+
+        if charges is None:
+            # the charge of every insertion depends on the route it is appended to, so the locations are appended with insert_at,
+            # which only updates the final depot visit unless a station is recharged
+            for loc in locs:
+                route.insert_at(loc)
+            return route
+
+        # with the charges given, the visits are built in one forward pass and the final depot visit is updated once all visits are in place
+        end = route.visits[-1]
+        route.visits[0].charge_quantity = charges[0]
+
+        for i, loc in enumerate(locs):
+            pred = route.visits[-2]
+            distance_pred_to_loc = data.distance_matrix[pred.loc, loc]
+            route.distance += distance_pred_to_loc + data.distance_matrix[loc, end.loc] - data.distance_matrix[pred.loc, end.loc]
+            arrival_time = pred.departure_time + distance_pred_to_loc / data.velocity
+            battery_level_upon_arrival = pred.battery_level_upon_departure - data.battery_consumption_rate * distance_pred_to_loc
+            visit = LocationVisit(data, route.policy, loc, arrival_time, pred.load_level_upon_departure, battery_level_upon_arrival)
+            visit.charge_quantity = charges[i + 1]
+            route.visits.insert(len(route.visits) - 1, visit)
+
+        route.update(len(route.visits) - 1, route.visits[-2].load_level_upon_departure - end.load_level_upon_departure)
+        end.charge_quantity = charges[-1]
+        route._battery_degradation_costs = route.sum_battery_degradation_costs()
+        return route
 
     @property
     def first_battery_violation_idx(self):
@@ -19,6 +63,10 @@ class Route:
         for i, visit in enumerate(self.visits):
             if not visit.is_battery_feasible:
                 return i
+
+        if not self.policy.is_final_battery_feasible(self.visits[-1].battery_level_upon_arrival):
+            return len(self.visits) - 1
+
         return -1
 
     @property
@@ -33,13 +81,51 @@ class Route:
 
     @property
     def required_charge(self):
-        """Calculates the amount vehicle needs to be charged in order to reach the depot battery empty"""
-        return max(0, self.distance * self.data.battery_consumption_rate - self.data.battery_capacity - self.total_charged_quantity)
+        """Calculates the amount vehicle needs to be charged in order to reach the depot with the final battery level of the charging policy"""
+        return self.policy.required_charge(self.distance, self.total_charged_quantity)
+
+    def station_insertion_required_charge(self, idx, detours, battery_levels):
+        """Bounds the required charge after inserting a station at position idx from below, for many stations and positions at once:
+        the charge the inserted station adds to the route is bounded by the charging policy
+        :param idx: position index of the insertion, or a NumPy column of position indices with a row of stations for each
+        :param detours: NumPy array of the changes in distance caused by the stations
+        :param battery_levels: NumPy array of the battery levels upon arrival to the stations
+        :return: NumPy array of the lower bounds of the required charge after inserting each station"""
+        missing_charge = ((self.distance + detours) * self.data.battery_consumption_rate - self.policy.initial_battery_level
+                          - self.total_charged_quantity + self.policy.final_battery_level)
+        return np.maximum(0, missing_charge - self.policy.inserted_station_charge_bound(self, idx, detours, battery_levels))
+
+    @property
+    def battery_degradation_costs(self):
+        """The costs of battery degradation as the sum of battery degradation costs of all visits, 0 when battery degradation is ignored.
+        The sum is kept as a running total: it is adjusted by the change in cost of every station or depot visit that is updated,
+        inserted or removed, so it may differ from summing the visits again by rounding"""
+        return self._battery_degradation_costs
+
+    def sum_battery_degradation_costs(self):
+        """Sums the battery degradation costs of the visits again, customer visits have no battery degradation cost
+        :return: the sum of the costs"""
+        costs = 0
+        for visit in self.visits:
+            if visit.has_battery_degradation_cost:
+                costs += visit.battery_degradation_cost
+        return costs
+
+    def set_charge_quantity(self, idx, charge_quantity):
+        """Sets the charge quantity of the visit at position idx and adjusts the battery degradation costs by the change in its cost,
+        the following visits are not updated
+        :param idx: position index of the visit
+        :param charge_quantity: the charge quantity, any charge above the battery capacity is reduced"""
+        visit = self.visits[idx]
+        battery_degradation_cost = visit.battery_degradation_cost
+        visit.charge_quantity = charge_quantity
+        if visit.has_battery_degradation_cost:
+            self._battery_degradation_costs += visit.battery_degradation_cost - battery_degradation_cost
 
     @property
     def total_cost(self):
-        """when battery degradation is ignored, the cost is just distance"""
-        return self.distance
+        """total cost as the sum of distance cost and battery degradation cost"""
+        return self.distance + self.battery_degradation_costs
 
     @property
     def is_feasible(self):
@@ -55,7 +141,62 @@ class Route:
         for visit in self.visits:
             if not visit.is_battery_feasible:
                 return False
-        return True
+        return self.policy.is_final_battery_feasible(self.visits[-1].battery_level_upon_arrival)
+
+    @property
+    def forward_time_slack(self):
+        """The forward time slack of every position: how much the arrival at that position can be delayed
+        before some visit from that position onwards arrives after its due time (cached until the route changes)"""
+        if self._forward_time_slack is None:
+            slack = [0] * len(self.visits)
+            following_slack = math.inf
+
+            for i in range(len(self.visits) - 1, -1, -1):
+                visit = self.visits[i]
+                waiting_time = max(0, self.data.ready_time[visit.loc] - visit.arrival_time)
+                following_slack = min(self.data.due_time[visit.loc] - visit.arrival_time, waiting_time + following_slack)
+                slack[i] = following_slack
+
+            self._forward_time_slack = slack
+        return self._forward_time_slack
+
+    @property
+    def station_time_slack(self):
+        """The time slack of every position up to the next station visit: how much the arrival at that position can be delayed
+        before some visit from that position up to the next station visit arrives after its due time.
+        A station visit may absorb a delay by charging less, so the visits after it are not considered"""
+        slack = [0] * len(self.visits)
+        following_slack = math.inf
+
+        for i in range(len(self.visits) - 1, -1, -1):
+            visit = self.visits[i]
+            if self.data.type[visit.loc] == "f":
+                following_slack = math.inf
+            waiting_time = max(0, self.data.ready_time[visit.loc] - visit.arrival_time)
+            following_slack = min(self.data.due_time[visit.loc] - visit.arrival_time, waiting_time + following_slack)
+            slack[i] = following_slack
+
+        return slack
+
+    def can_insert(self, loc, idx):
+        """Checks in constant time if inserting customer loc at position idx can result in a feasible route.
+        Only the load and the due times are checked, using the cached forward time slack of the successor:
+        a battery shortage is repaired afterwards by recharging or inserting stations, which can only delay the route further
+        :param loc: location index of the customer
+        :param idx: position index in the route where the insertion would be made
+        :return: False if the insertion is certainly infeasible, True otherwise"""
+        if self.visits[-1].load_level_upon_departure < self.data.demand[loc]:
+            return False
+
+        pred = self.visits[idx - 1]
+        suc = self.visits[idx]
+        arrival_time = pred.departure_time + self.data.distance_matrix[pred.loc, loc] / self.data.velocity
+        if arrival_time > self.data.due_time[loc] + FEASIBILITY_TOLERANCE:
+            return False
+
+        start_time = max(arrival_time, self.data.ready_time[loc])
+        suc_arrival_time = start_time + self.data.service_time[loc] + self.data.distance_matrix[loc, suc.loc] / self.data.velocity
+        return suc_arrival_time - suc.arrival_time <= self.forward_time_slack[idx] + FEASIBILITY_TOLERANCE
 
     def get_last_source_visit(self, idx):
         """returns the most recent visit to the station for position idx
@@ -81,6 +222,26 @@ class Route:
 
         return min_arrival_due_time_difference / self.data.recharging_rate
 
+    def evaluate_insert(self, loc, idx=None, feasibility_only=False):
+        """Evaluates inserting location loc at position idx without altering the route, only the visits the insertion changes are copied
+        :param loc: location index of insertion (which customer/station)
+        :param idx: position index in the route where the insertion would be made
+        :param feasibility_only: if True, the evaluation stops at the first time or load violation, only is_feasible is then meaningful
+        :return: a MoveEvaluation with the distance change, feasibility, required charge and battery levels after the insertion"""
+        evaluation = MoveEvaluation(self, feasibility_only=feasibility_only)
+        evaluation.insert_at(loc, idx)
+        return evaluation
+
+    def evaluate_remove(self, idx, feasibility_only=False):
+        """Evaluates removing the visit at position idx, together with the stations that would no longer be necessary,
+        without altering the route, only the visits the removal changes are copied
+        :param idx: position index of the visit to remove
+        :param feasibility_only: if True, the evaluation stops at the first time or load violation, only is_feasible is then meaningful
+        :return: a MoveEvaluation with the distance change, feasibility, required charge and battery levels after the removal"""
+        evaluation = MoveEvaluation(self, feasibility_only=feasibility_only)
+        evaluation.remove_visit_at(idx)
+        return evaluation
+
     def insert_at(self, loc, idx=None):
         """inserts location loc at position idx
         :param loc: location index of insertion (which customer/station))
@@ -103,24 +264,23 @@ class Route:
         self.distance += change_in_distance
         charge_quantity = 0
 
-        if self.data.type[loc] == "f" and self.required_charge > 0:
-            charge_quantity = min(self.required_charge, available_battery_space)
+        if self.data.type[loc] == "f":
+            charge_quantity = self.policy.inserted_station_charge(self, available_battery_space)
 
         if loc == pred.loc:
-            pred.charge_quantity += charge_quantity
+            self.set_charge_quantity(idx - 1, self.policy.merged_station_charge(pred.charge_quantity, pred.battery_level_upon_arrival, charge_quantity))
             idx -= 1
         elif loc == suc.loc:
-            suc.charge_quantity += charge_quantity
+            self.set_charge_quantity(idx, self.policy.merged_station_charge(suc.charge_quantity, suc.battery_level_upon_arrival, charge_quantity))
             idx -= 1
         else:
-            visit = LocationVisit(self.data, loc, arrival_time, load_level_upon_arrival, battery_level_upon_arrival, charge_quantity)
+            visit = LocationVisit(self.data, self.policy, loc, arrival_time, load_level_upon_arrival, battery_level_upon_arrival, charge_quantity)
             self.visits.insert(idx, visit)
+            if visit.has_battery_degradation_cost:
+                self._battery_degradation_costs += visit.battery_degradation_cost
 
-        for i in range(idx + 1, len(self.visits)):
-            self.update(i, load_level_difference)
-
-        if self.data.type[loc] == "c":
-            self.adjust_recharge(idx)
+        self.propagate(idx + 1, load_level_difference)
+        self.policy.repair_after_insert(self, loc, idx)
 
     def adjust_recharge(self, idx):
         """attempts to make the route battery feasible by increasing charge quantity in existing stations without causing time infeasibility
@@ -130,15 +290,44 @@ class Route:
 
             time_feasible_recharge_quantity = min(self.possible_charge_before_time_infeasible(recharge_at), self.required_charge)
             if time_feasible_recharge_quantity > 0:
-                self.visits[recharge_at].charge_quantity += time_feasible_recharge_quantity
+                self.set_charge_quantity(recharge_at, self.visits[recharge_at].charge_quantity + time_feasible_recharge_quantity)
                 # print(f"INCREASE THE CHARGE IN {self.visits[recharge_at].loc} by {time_feasible_recharge_quantity}")
-                for i in range(recharge_at + 1, len(self.visits)):
-                    self.update(i, 0)
+                self.propagate(recharge_at + 1, 0)
+
+            if self.policy.least_recharge and not self.is_battery_feasible:
+                charges = least_recharge_quantities(self.data, [visit.loc for visit in self.visits])
+                if charges is not None:
+                    self.set_charge_quantities(charges)
+
+    def recharge_last_station(self):
+        """charges the last station visit before the first battery infeasible visit full if that does not cause time infeasibility"""
+        if not self.is_battery_feasible:
+            recharge_at = self.get_last_source_visit(self.first_battery_violation_idx)
+
+            if recharge_at != 0:
+                available_battery_space = self.data.battery_capacity - self.visits[recharge_at].battery_level_upon_arrival
+                if available_battery_space <= self.possible_charge_before_time_infeasible(recharge_at):
+                    self.set_charge_quantity(recharge_at, available_battery_space)
+                    self.propagate(recharge_at + 1, 0)
+
+    def set_charge_quantities(self, charges):
+        """sets the charged quantities of all visits and updates the visits in one forward pass
+        :param charges: the charged quantities at all visits including the two depot visits, any charge above the battery capacity is reduced"""
+        self.set_charge_quantity(0, charges[0])
+
+        for i in range(1, len(self.visits)):
+            self.update(i, 0)
+            self.set_charge_quantity(i, charges[i])
 
     def remove_visit(self, visit):
         """Removes the visit from the route
         :param visit: the location visit object to remove"""
-        idx = self.visits.index(visit)
+        self.remove_visit_at(self.visits.index(visit))
+
+    def remove_visit_at(self, idx):
+        """Removes the visit at position idx from the route
+        :param idx: position index of the visit to remove"""
+        visit = self.visits[idx]
         pred = self.visits[idx - 1]
         suc = self.visits[idx + 1]
         # print(f"REMOVING: {pred.loc} - {visit.loc} - {suc.loc}")
@@ -150,50 +339,151 @@ class Route:
         change_in_distance = distance_pred_to_suc - (distance_pred_to_loc + distance_loc_to_suc)
         load_level_difference = self.data.demand[visit.loc]
         self.distance += change_in_distance
-        self.visits.remove(visit)
+        del self.visits[idx]
+        if visit.has_battery_degradation_cost:
+            self._battery_degradation_costs -= visit.battery_degradation_cost
 
-        for i in range(idx, len(self.visits)):
-            self.update(i, load_level_difference)
+        self.propagate(idx, load_level_difference)
 
         if self.data.type[visit.loc] == "c":
             self.remove_customer_with_succeeding_station(idx)
             self.remove_customer_with_preceding_station(idx)
 
+    def remove_many(self, visits):
+        """Removes several visits from the route at once. The route is updated in a single forward pass
+        and the stations next to the removed customers that are no longer necessary are removed afterwards
+        :param visits: the location visit objects to remove"""
+        to_remove = set(map(id, visits))
+        kept_visits = [self.visits[0]]
+        stations_to_check = []
+        removed_demand = 0
+        customer_removed = False
+        first_idx = last_idx = None
+
+        for prev, visit in zip(self.visits, self.visits[1:]):
+            if id(visit) in to_remove:
+                self.distance -= self.data.distance_matrix[prev.loc, visit.loc]
+                removed_demand += self.data.demand[visit.loc]
+                customer_removed = customer_removed or self.data.type[visit.loc] == "c"
+                if visit.has_battery_degradation_cost:
+                    self._battery_degradation_costs -= visit.battery_degradation_cost
+                if first_idx is None:
+                    first_idx = len(kept_visits)
+                continue
+
+            if prev is not kept_visits[-1]:
+                # first visit after removed visits
+                pred = kept_visits[-1]
+                self.distance += self.data.distance_matrix[pred.loc, visit.loc] - self.data.distance_matrix[prev.loc, visit.loc]
+                last_idx = len(kept_visits)
+                if customer_removed:
+                    # positions of the stations in the route after the removal
+                    stations_to_check += [i for i, station in ((last_idx - 1, pred), (last_idx, visit)) if self.data.type[station.loc] == "f"]
+                customer_removed = False
+
+            visit.load_level_upon_departure += removed_demand
+            kept_visits.append(visit)
+
+        if first_idx is None:
+            return
+
+        self.visits = kept_visits
+        self.propagate(first_idx, 0, last_idx)
+
+        # the succeeding station is checked before the preceding one, from the last removal to the first as in remove_visit,
+        # so removing a station does not move the stations that are checked after it. A station between two removals is listed twice
+        removed_idx = None
+        for idx in reversed(stations_to_check):
+            if idx != removed_idx and self.is_station_redundant(idx):
+                self.remove_visit_at(idx)
+                removed_idx = idx
+
+    def is_station_redundant(self, idx):
+        """Checks if the station visit at position idx can be removed with the route staying battery feasible,
+        the battery levels without the visit are replayed from the stored battery levels and charged quantities,
+        which gives the same levels as removing the visit from a copy of the route
+        :param idx: position index of the station visit
+        :return: True if the route without the visit would be battery feasible"""
+        for visit in self.visits[:idx]:
+            if not visit.is_battery_feasible:
+                return False
+
+        prev = self.visits[idx - 1]
+        battery_level_upon_departure = prev.battery_level_upon_departure
+
+        for visit in self.visits[idx + 1:]:
+            distance = self.data.distance_matrix[prev.loc, visit.loc]
+            battery_level = battery_level_upon_departure - self.data.battery_consumption_rate * distance
+            if battery_level < 0 and not math.isclose(battery_level, 0, abs_tol=1e-9):
+                return False
+
+            battery_level_upon_departure = battery_level + min(visit.charge_quantity, self.data.battery_capacity - battery_level)
+            prev = visit
+
+        return self.policy.is_final_battery_feasible(battery_level)
 
     def remove_customer_with_preceding_station(self, removed_idx):
         """If removed customer was after a visit to the station which is no longer necessary
         that visit to the station is also removed
         :param: removed_idx: position index of the customer visit that was removed"""
-        if self.data.type[self.visits[removed_idx - 1].loc] == 'f':
-            copied_route = copy.deepcopy(self)
-            copied_route.remove_visit(copied_route.visits[removed_idx - 1])
-
-            if copied_route.is_battery_feasible:
-                # print(f"removing unnecessary station visit")
-                self.remove_visit(self.visits[removed_idx - 1])
+        if self.data.type[self.visits[removed_idx - 1].loc] == 'f' and self.is_station_redundant(removed_idx - 1):
+            # print(f"removing unnecessary station visit")
+            self.remove_visit_at(removed_idx - 1)
 
     def remove_customer_with_succeeding_station(self, removed_idx):
         """If removed customer was before a visit to the station which is no longer necessary
         that visit to the station is also removed
         :param: removed_idx: position index of the customer visit that was removed"""
-        if self.data.type[self.visits[removed_idx].loc] == 'f':
-            copied_route = copy.deepcopy(self)
-            copied_route.remove_visit(copied_route.visits[removed_idx])
+        if self.data.type[self.visits[removed_idx].loc] == 'f' and self.is_station_redundant(removed_idx):
+            # print(f"removing unnecessary station visit")
+            self.remove_visit_at(removed_idx)
+
+    def propagate(self, idx, load_level_difference, changed_until=None):
+        """Updates the visits from position idx onwards after the visit before idx changed.
+        The visit at idx is always updated, the propagation stops at the first later visit whose arrival time
+        and battery level upon arrival stay the same: it departs as before, so the visits after it would not change either
+        and only their load levels are updated
+        :param: idx: position index of the first visit to update
+        :param: load_level_difference: inserted (negative)/ removed (positive) visit's demand
+        :param: changed_until: position index of the last visit whose predecessor changed, the propagation does not stop before it
+        (idx by default)"""
+        if changed_until is None:
+            changed_until = idx
+
+        self.update(idx, load_level_difference)
 
-            if copied_route.is_battery_feasible:
-                # print(f"removing unnecessary station visit")
-                self.remove_visit(self.visits[removed_idx])
+        for i in range(idx + 1, len(self.visits)):
+            if not self.update(i, load_level_difference) and i >= changed_until:
+                if load_level_difference != 0:
+                    self.shift_load_levels(i + 1, load_level_difference)
+                break
+
+    def shift_load_levels(self, idx, load_level_difference):
+        """Changes the load levels of the visits from position idx onwards, whose arrival times and battery levels stay the same
+        :param: idx: position index of the first visit to change
+        :param: load_level_difference: inserted (negative)/ removed (positive) visit's demand"""
+        for visit in self.visits[idx:]:
+            visit.load_level_upon_departure += load_level_difference
 
     def update(self, idx, load_level_difference):
         """Updates following visits after location is inserted/removed at position idx
         :param: idx: position index of the inserted/removed visit
-        :param: load_level_difference: inserted (negative)/ removed (positive) visit's demand"""
+        :param: load_level_difference: inserted (negative)/ removed (positive) visit's demand
+        :return: True if the arrival time or the battery level upon arrival of the visit changed"""
+        self._forward_time_slack = None
         prev = self.visits[idx - 1]
         to_update = self.visits[idx]
         new_distance = self.data.distance_matrix[prev.loc, to_update.loc]
         new_arrival_time = prev.departure_time + new_distance / self.data.velocity
         new_battery_level = prev.battery_level_upon_departure - self.data.battery_consumption_rate * new_distance
-        to_update.update(new_arrival_time, load_level_difference, new_battery_level)
+        changed = new_arrival_time != to_update.arrival_time or new_battery_level != to_update.battery_level_upon_arrival
+        if to_update.has_battery_degradation_cost:
+            battery_degradation_cost = to_update.battery_degradation_cost
+            to_update.update(new_arrival_time, load_level_difference, new_battery_level)
+            self._battery_degradation_costs += to_update.battery_degradation_cost - battery_degradation_cost
+        else:
+            to_update.update(new_arrival_time, load_level_difference, new_battery_level)
+        return changed
 
     def print(self):
         """Prints all the relevant information on this route and its location visits"""
@@ -202,6 +492,7 @@ class Route:
         print(F"is battery feasible? {self.is_battery_feasible}")
         print(f"total route distance: {self.distance}")
         print(f"total charged quantity: {self.total_charged_quantity}")
+        print(f"total BD cost: {self.battery_degradation_costs}")
         current_loc = 0
         for visit in self.visits:
             loc = visit.loc
@@ -210,3 +501,100 @@ class Route:
             print(f"distance to: {distance}")
             visit.print()
 
+
+class MoveEvaluation(Route):
+    """The state a route would have after an insertion or a removal.
+    The move is made with the methods of the route on a list of the same visit objects, and a visit is copied before the move changes it,
+    so the evaluation gives exactly the values the route itself would have without altering the route"""
+    def __init__(self, route, feasibility_only=False):
+        """Takes the current state of the route
+        :param route: the route on which the moves are evaluated
+        :param feasibility_only: if True, the evaluation stops at the first visit that arrives after its due time or has a negative load,
+        is_feasible is then False and the other values are not meaningful"""
+        self.data = route.data
+        self.policy = route.policy
+        self.route = route
+        self.feasibility_only = feasibility_only
+        self.violated = False
+        self.original_distance = route.distance
+        self.distance = route.distance
+        self._battery_degradation_costs = route._battery_degradation_costs
+        self._forward_time_slack = None
+        self.visits = list(route.visits)
+        # ids of the visits that are still those of the route, they are copied before they are changed
+        self._shared_visits = set(map(id, self.visits))
+
+    @property
+    def distance_delta(self):
+        """the change in the distance of the route caused by the move"""
+        return self.distance - self.original_distance
+
+    @property
+    def is_feasible(self):
+        """Route is feasible if all its location visits are feasible"""
+        return not self.violated and super().is_feasible
+
+    def own_visit(self, idx):
+        """Replaces the visit at position idx by a copy if it is still a visit of the route
+        :param idx: position index of the visit"""
+        visit = self.visits[idx]
+        if id(visit) in self._shared_visits:
+            self.visits[idx] = visit.copy()
+
+    def set_charge_quantity(self, idx, charge_quantity):
+        """sets the charge quantity of the visit at position idx as Route.set_charge_quantity does, without changing the visit of the route
+        :param idx: position index of the visit
+        :param charge_quantity: the charge quantity"""
+        self.own_visit(idx)
+        super().set_charge_quantity(idx, charge_quantity)
+
+    def update(self, idx, load_level_difference):
+        """Updates the visit at position idx as Route.update does, without changing the visit of the route.
+        When only the feasibility is evaluated, the propagation stops at the first time or load violation
+        :param: idx: position index of the visit to update
+        :param: load_level_difference: inserted (negative)/ removed (positive) visit's demand
+        :return: True if the arrival time or the battery level upon arrival of the visit changed"""
+        if self.violated:
+            return False
+
+        self.own_visit(idx)
+        changed = super().update(idx, load_level_difference)
+
+        if self.feasibility_only and not self.visits[idx].is_feasible:
+            self.violated = True
+            return False
+        return changed
+
+    def shift_load_levels(self, idx, load_level_difference):
+        """changes the load levels as Route.shift_load_levels does, without changing the visits of the route
+        :param: idx: position index of the first visit to change
+        :param: load_level_difference: inserted (negative)/ removed (positive) visit's demand"""
+        if self.violated:
+            return
+
+        for i in range(idx, len(self.visits)):
+            self.own_visit(i)
+        super().shift_load_levels(idx, load_level_difference)
+
+    def adjust_recharge(self, idx):
+        """recharges as Route.adjust_recharge does, unless the evaluation already stopped at a violation
+        :param idx: position index of the newly inserted location"""
+        if not self.violated:
+            super().adjust_recharge(idx)
+
+    def recharge_last_station(self):
+        """recharges as Route.recharge_last_station does, unless the evaluation already stopped at a violation"""
+        if not self.violated:
+            super().recharge_last_station()
+
+    def remove_customer_with_preceding_station(self, removed_idx):
+        """removes the preceding station as Route.remove_customer_with_preceding_station does, unless the evaluation already stopped at a violation
+        :param: removed_idx: position index of the customer visit that was removed"""
+        if not self.violated:
+            super().remove_customer_with_preceding_station(removed_idx)
+
+    def remove_customer_with_succeeding_station(self, removed_idx):
+        """removes the succeeding station as Route.remove_customer_with_succeeding_station does, unless the evaluation already stopped at a violation
+        :param: removed_idx: position index of the customer visit that was removed"""
+        if not self.violated:
+            super().remove_customer_with_succeeding_station(removed_idx)
@@ -1,26 +1,153 @@
+import copy
+from chargingOptimization import least_recharge_quantities
+
 class Solution:
-    """Solution object that contains routes"""
+    """Solution object that contains routes
+    Routes may be shared with the solution this one was copied from, they are cloned only when first altered"""
     def __init__(self, data):
         """Initializes a new empty solution object
         :param data: data object of the current instance"""
         self.data = data
         self.routes = []
+        # ids of the routes that belong to this solution only and can be altered in place
+        self._owned = set()
+        # deepcopy memo of the cloned routes, maps ids of shared routes and their visits to the private copies
+        self._clones = {}
+        # id of a route -> (distance, battery degradation costs, is feasible, is battery feasible,
+        # positions of the customer visits, positions of the station visits) of the route,
+        # a route is removed when it is altered or leaves the solution
+        self._route_values = {}
+        # the same values for the whole solution, None if a route was altered, added or removed since they were calculated
+        self._totals = None
+
+    def __getstate__(self):
+        """a pickled solution (e.g. sent to another process) owns none of its routes, as the ids of the routes change
+        :return: the attributes of the solution to pickle"""
+        state = self.__dict__.copy()
+        state["_owned"] = set()
+        state["_clones"] = {}
+        state["_route_values"] = {}
+        state["_totals"] = None
+        return state
+
+    def copy(self):
+        """Returns a copy-on-write copy of the solution, the route objects are shared until one of the solutions alters them
+        :return: the copied solution"""
+        copied_solution = Solution(self.data)
+        copied_solution.routes = list(self.routes)
+        copied_solution._route_values = dict(self._route_values)
+        copied_solution._totals = self._totals
+        # the routes are shared from now on, so this solution has to clone them before altering them as well
+        self._owned = set()
+        self._clones = {}
+        return copied_solution
+
+    def own(self, route):
+        """Returns the version of the route that this solution is allowed to alter,
+        a shared route is cloned and replaced in the solution when accessed for the first time
+        :param route: a route of this solution, or a shared route that has already been cloned
+        :return: the route object that can be altered in place"""
+        if id(route) in self._owned:
+            self.changed(route)
+            return route
+        if id(route) in self._clones:
+            cloned_route = self._clones[id(route)]
+            self.changed(cloned_route)
+            return cloned_route
+
+        idx = self.routes.index(route)
+        cloned_route = copy.deepcopy(route, self._clones)
+        self.routes[idx] = cloned_route
+        self._owned.add(id(cloned_route))
+        self.changed(route)
+        return cloned_route
+
+    def changed(self, route):
+        """Forgets the values of a route that is altered or leaves the solution
+        :param route: the route object"""
+        self._route_values.pop(id(route), None)
+        self._totals = None
+
+    def route_values(self, route):
+        """Returns the values of a route of the solution, they are only evaluated after the route was altered
+        :param route: a route of this solution
+        :return: distance, battery degradation costs, is feasible, is battery feasible,
+        positions of the customer visits and positions of the station visits"""
+        values = self._route_values.get(id(route))
+        if values is None:
+            customer_positions = []
+            station_positions = []
+            for i, visit in enumerate(route.visits):
+                if self.data.type[visit.loc] == "c":
+                    customer_positions.append(i)
+                elif self.data.type[visit.loc] == "f":
+                    station_positions.append(i)
+
+            values = (route.distance, route.battery_degradation_costs, route.is_feasible, route.is_battery_feasible,
+                      customer_positions, station_positions)
+            self._route_values[id(route)] = values
+        return values
+
+    def visit_positions(self, route, type):
+        """Returns the positions of the customer or station visits in a route of the solution
+        :param route: a route of this solution
+        :param type: 'c' for customers, 'f' for stations
+        :return: a list of position indices in ascending order"""
+        if type == "c":
+            return self.route_values(route)[4]
+        return self.route_values(route)[5]
+
+    def count_visits(self, type):
+        """Returns the number of customer or station visits in the solution
+        :param type: 'c' for customers, 'f' for stations
+        :return: the number of visits"""
+        return sum(len(self.visit_positions(route, type)) for route in self.routes)
+
+    def random_visit(self, rnd, type):
+        """Selects a customer or station visit at random, in the same way as rnd.choice(self.customer_visits)
+        or rnd.choice(self.source_visits), without listing all visits
+        :param rnd: the RND used for this instance run
+        :param type: 'c' for customers, 'f' for stations
+        :return: the route and the selected visit"""
+        k = rnd.randrange(self.count_visits(type))
+
+        for route in self.routes:
+            positions = self.visit_positions(route, type)
+            if k < len(positions):
+                return route, route.visits[positions[k]]
+            k -= len(positions)
+
+    @property
+    def totals(self):
+        """the distance, battery degradation costs, feasibility and battery feasibility of the solution,
+        only calculated again after a route was altered, added or removed, from the stored values of the unaltered routes.
+        A query is O(1) until a route changes, the first query after a change sums the values of all routes (O(routes)),
+        as adjusting the totals by differences would not keep them equal to these sums"""
+        if self._totals is None:
+            distance = 0
+            battery_degradation_cost = 0
+            is_feasible = True
+            is_battery_feasible = True
+
+            for route in self.routes:
+                route_distance, route_battery_degradation_cost, route_feasible, route_battery_feasible, _, _ = self.route_values(route)
+                distance += route_distance
+                battery_degradation_cost += route_battery_degradation_cost
+                is_feasible = is_feasible and route_feasible
+                is_battery_feasible = is_battery_feasible and route_battery_feasible
+
+            self._totals = (distance, battery_degradation_cost, is_feasible, is_battery_feasible)
+        return self._totals
 
     @property
     def total_distance(self):
         """Calculates the total distance as the sum of all route distances"""
-        dist = 0
-        for route in self.routes:
-            dist += route.distance
-        return dist
+        return self.totals[0]
 
     @property
     def total_battery_degradation_cost(self):
         """the total battery degradation cost as the sum of these costs of all routes"""
-        cost = 0
-        for route in self.routes:
-            cost += route.battery_degradation_costs
-        return cost
+        return self.totals[1]
 
     @property
     def total_cost(self):
@@ -33,9 +160,8 @@ class Solution:
         :return a list of customer visits"""
         visits = []
         for route in self.routes:
-            for visit in route.visits:
-                if self.data.type[visit.loc] == "c":
-                    visits.append((route, visit))
+            for i in self.visit_positions(route, "c"):
+                visits.append((route, route.visits[i]))
         return visits
 
     @property
@@ -44,46 +170,95 @@ class Solution:
         :return a list of source visits"""
         visits = []
         for route in self.routes:
-            for visit in route.visits:
-                if self.data.type[visit.loc] == "f":
-                    visits.append((route, visit))
+            for i in self.visit_positions(route, "f"):
+                visits.append((route, route.visits[i]))
         return visits
 
     @property
     def is_feasible(self):
         """Solution is feasible if all routes are feasible"""
-        for route in self.routes:
-            if not route.is_feasible:
-                return False
-        return True
+        return self.totals[2]
 
     @property
     def is_battery_feasible(self):
         """Solution is battery feasible if all routes are battery feasible"""
-        for route in self.routes:
-            if not route.is_battery_feasible:
-                return False
-        return True
+        return self.totals[3]
 
     @property
     def all_customers_visited(self):
         """Returns true if all customers were visited, false otherwise"""
-        return len(self.customer_visits) == self.data.n_customer
+        return self.count_visits("c") == self.data.n_customer
 
     def add_route(self, route):
         """Adds a route to the solution
         :param route: route object to insert"""
+        self.changed(route)
         self.routes.append(route)
+        self._owned.add(id(route))
+
+    def replace_route(self, route_idx, route):
+        """Replaces the route at the given index with a route that belongs to this solution only
+        :param route_idx: index of the route to replace
+        :param route: route object to insert in its place"""
+        self._owned.discard(id(self.routes[route_idx]))
+        self.changed(self.routes[route_idx])
+        self.changed(route)
+        self.routes[route_idx] = route
+        self._owned.add(id(route))
 
     def remove_route(self, route):
         """Removes a route from the solution
         :param route: route object to remove
         :return the lists of visits of the removed route"""
+        route = self._clones.get(id(route), route)
         self.routes.remove(route)
+        self._owned.discard(id(route))
+        self.changed(route)
         return route.visits
 
+    def insert_at(self, route, loc, idx=None):
+        """Inserts location loc at position idx of the route, cloning the route first if it is shared
+        :param route: route of the insertion
+        :param loc: location index of insertion
+        :param idx: position index in the route where to make the insertion"""
+        self.own(route).insert_at(loc, idx)
+
+    def recharge_least(self, route):
+        """Redistributes the charges among the stations of the route with the least total recharge (free PR strategy),
+        cloning the route first if it is shared. The charges are computed for the sequence of visits from scratch, so the route is altered
+        whenever some charges meet the time windows and keep the battery levels feasible, whether the route met the time windows before or not
+        :param route: route to recharge
+        :return: True if the charges were redistributed"""
+        charges = least_recharge_quantities(self.data, [visit.loc for visit in route.visits])
+        if charges is None:
+            return False
+
+        self.own(route).set_charge_quantities(charges)
+        return True
+
+    def remove_visit(self, route, visit):
+        """Removes the visit from the route, cloning the route first if it is shared
+        :param route: route that contains the visit
+        :param visit: the location visit object to remove"""
+        route = self.own(route)
+        route.remove_visit(self._clones.get(id(visit), visit))
+
+    def remove_customers(self, locs):
+        """Removes the visits to the customers from the solution, grouped by route:
+        every altered route is cloned first if it is shared and repaired once
+        :param locs: location indices of the customers to remove"""
+        locs = set(locs)
+
+        for route in list(self.routes):
+            positions = [i for i in self.visit_positions(route, "c") if route.visits[i].loc in locs]
+            if len(positions) > 0:
+                route = self.own(route)
+                route.remove_many([route.visits[i] for i in positions])
+
     def remove_empty_routes(self):
         """Removes all routes that do not contain any customer visits"""
-        for route in self.routes:
+        for route in list(self.routes):
             if len(route.visits) <= 2:
-                self.routes.remove(route)
\ No newline at end of file
+                self.routes.remove(route)
+                self._owned.discard(id(route))
+                self.changed(route)
\ No newline at end of file
@@ -1,4 +1,7 @@
-import copy
+import heapq
+import math
+import numpy as np
+from chargingOptimization import FEASIBILITY_TOLERANCE, ROUNDING_MARGIN
 
 class StationInsertion:
     """Operations for inserting stations"""
@@ -26,6 +29,12 @@ class StationInsertion:
         :return: operation used and solution after insertion"""
         operation = self.choose_operation()
 
+        if solution.is_feasible:
+            # a route may only need its charges redistributed, e.g. after a station removal
+            for route in list(solution.routes):
+                if route.policy.least_recharge and not route.is_battery_feasible:
+                    solution.recharge_least(route)
+
         while solution.is_feasible and not solution.is_battery_feasible:
             inserted_list, solution = operation(solution)
             if len(inserted_list) == 0:
@@ -43,7 +52,7 @@ class StationInsertion:
         for route in solution.routes:
             to_insert = greedy_station_insertion(self.data, route)
             if to_insert is not None:
-                route.insert_at(*to_insert)
+                solution.insert_at(route, *to_insert)
                 inserted_stations.append(to_insert[0])
 
         return inserted_stations, solution
@@ -58,7 +67,7 @@ class StationInsertion:
         for route in solution.routes:
             to_insert = greedy_station_insertion(self.data, route, True)
             if to_insert is not None:
-                route.insert_at(*to_insert)
+                solution.insert_at(route, *to_insert)
                 inserted_stations.append(to_insert[0])
 
         return inserted_stations, solution
@@ -71,27 +80,20 @@ class StationInsertion:
 
         for route in solution.routes:
             start_idx = route.first_battery_violation_idx
-            all_insertions = []
 
             if start_idx < 1:
                 continue
 
-            last_station_visit = route.get_last_source_visit(start_idx)
-
-            for i in range(last_station_visit + 1, start_idx):
-                insertions = insertion_costs(self.data, route, i)
-                all_insertions.extend(insertions)
-
-            all_insertions.sort(key=lambda x: x[2], reverse=False)
+            required_charge = route.required_charge
+            if required_charge <= 0:
+                continue
 
-            for insertion in all_insertions:
-                loc, idx, cost = insertion
-                copied_route = copy.deepcopy(route)
-                copied_route.insert_at(loc, idx)
-                inserted_visit = copied_route.visits[idx]
+            last_station_visit = route.get_last_source_visit(start_idx)
+            locs, idxs, _, certain = station_insertion_candidates(self.data, route, range(last_station_visit + 1, start_idx), required_charge)
 
-                if copied_route.required_charge < route.required_charge and inserted_visit.is_battery_feasible and copied_route.is_feasible:
-                    route.insert_at(loc, idx)
+            for loc, idx, repairing in zip(locs.tolist(), idxs.tolist(), certain.tolist()):
+                if repairing or repairs(route, loc, idx, required_charge):
+                    solution.insert_at(route, loc, idx)
                     inserted_stations.append(loc)
                     break
 
@@ -112,22 +114,23 @@ def greedy_station_insertion(data, route, with_comparison = False):
     start_idx = route.first_battery_violation_idx
     idx = start_idx
     to_insert = None
+    required_charge = route.required_charge
+    if required_charge <= 0:
+        # the required charge after an insertion is never negative, so no insertion lowers it
+        return None
+    bounds = exact_insertion_bounds(data, route, required_charge)
 
     while idx > 0 and to_insert is None:
-        insertions = insertion_costs(data, route, idx)
+        insertions = insertion_costs(data, route, idx, required_charge, bounds)
 
         if with_comparison and idx == start_idx and idx > 1:
-            insertions_earlier = insertion_costs(data, route, idx - 1)
-            insertions.extend(insertions_earlier)
-            insertions.sort(key=lambda x: x[2], reverse=False)
+            insertions_earlier = insertion_costs(data, route, idx - 1, required_charge, bounds)
+            insertions = heapq.merge(insertions, insertions_earlier, key=lambda x: x[2])
 
         for insertion in insertions:
-            loc, i, cost = insertion
-            copied_route = copy.deepcopy(route)
-            copied_route.insert_at(loc, i)
-            inserted_visit = copied_route.visits[i]
+            loc, i, cost, certain = insertion
 
-            if copied_route.required_charge < route.required_charge and inserted_visit.is_battery_feasible and copied_route.is_feasible:
+            if certain or repairs(route, loc, i, required_charge):
                 to_insert = (loc, i)
                 break
 
@@ -136,19 +139,192 @@ def greedy_station_insertion(data, route, with_comparison = False):
 
     return to_insert
 
-def insertion_costs(data, route, idx):
-    """calculates insertion costs for all stations
+def repairs(route, loc, idx, required_charge):
+    """evaluates if inserting a station repairs the route: the required charge is lowered,
+    the inserted station is battery feasible and the route stays feasible
+    :param route: the route to be repaired
+    :param loc: location index of the station
+    :param idx: position index of insertion
+    :param required_charge: the required charge of the route
+    :return: True if the insertion repairs the route"""
+    evaluation = route.evaluate_insert(loc, idx)
+    return evaluation.required_charge < required_charge and evaluation.visits[idx].is_battery_feasible and evaluation.is_feasible
+
+def exact_insertion_bounds(data, route, required_charge):
+    """the bounds with which decide_insertions decides station insertions without evaluating them,
+    when the charging policy charges an inserted station exactly as the bound of the required charge assumes
+    :param data: the data of the instance
+    :param route: the route to be repaired
+    :param required_charge: the required charge of the route
+    :return: NumPy arrays with for every position: the least battery space upon departure of the station visits from that position on,
+    the least time before the due time of the visits from that position on, the forward time slack, the time slack up to the next
+    station visit and whether the visit already departs with a full battery,
+    or None if the insertions into the route cannot be decided this way"""
+    if not route.policy.exact_station_insertion or required_charge <= 0 or not route.is_feasible:
+        return None
+
+    visits = route.visits
+    following_battery_space = [math.inf] * len(visits)
+    following_time_before_due = [math.inf] * len(visits)
+    charged_full = [False] * len(visits)
+    battery_space = math.inf
+    time_before_due = math.inf
+
+    for i in range(len(visits) - 1, -1, -1):
+        visit = visits[i]
+        if data.type[visit.loc] == "f":
+            battery_space = min(battery_space, data.battery_capacity - visit.battery_level_upon_departure)
+        time_before_due = min(time_before_due, data.due_time[visit.loc] - visit.arrival_time)
+        following_battery_space[i] = battery_space
+        following_time_before_due[i] = time_before_due
+        # the charge quantity of a visit is cut to exactly the battery space upon arrival
+        charged_full[i] = visit.charge_quantity == data.battery_capacity - visit.battery_level_upon_arrival
+
+    return (np.array(following_battery_space), np.array(following_time_before_due), np.asarray(route.forward_time_slack),
+            np.asarray(route.station_time_slack), np.array(charged_full))
+
+def decide_insertions(data, bounds, idx, required_charge, stations, detours, battery_levels, arrival_times, suc_delays, merged_pred, merged_suc):
+    """decides station insertions at once with the bounds of exact_insertion_bounds, the charge of the inserted station,
+    the battery level upon arrival and the delay of the successor are calculated as in insert_at.
+    Charging the inserted station raises the battery levels after it by its charge minus the energy of the detour,
+    the following station visits charge less once they reach the full battery, so the required charge decreases by the least of
+    this rise and their battery space upon departure. The route stays time feasible if the delay of the successor
+    is within its forward time slack, and it certainly does not if the delay exceeds the time slack up to the next station visit,
+    or the forward time slack while the following stations keep their charges.
+    A station that is the predecessor or the successor is not decided, unless that visit already charges to the full battery,
+    then the insertion does not alter the route and does not repair it. Only the insertions beyond the rounding margin are decided
+    :param data: the data of the instance
+    :param bounds: the bounds of exact_insertion_bounds
+    :param idx: the position index of insertion, or a NumPy column of position indices
+    :param required_charge: the required charge of the route
+    :param stations: NumPy array of the location indices of the stations
+    :param detours: NumPy array of the changes in distance caused by the stations
+    :param battery_levels: NumPy array of the battery levels upon arrival to the stations
+    :param arrival_times: NumPy array of the arrival times to the stations
+    :param suc_delays: NumPy array of the delays of the successor without charging
+    :param merged_pred: NumPy array, True where the station is the predecessor
+    :param merged_suc: NumPy array, True where the station is the successor
+    :return: two NumPy arrays, True where the insertion certainly repairs the route and where it certainly does not"""
+    following_battery_space, following_time_before_due, forward_time_slack, station_time_slack, charged_full = bounds
+    merged = merged_pred | merged_suc
+    energy = data.battery_consumption_rate * detours
+    # the inserted station charges the required charge after the detour, up to the battery space upon arrival
+    charges = np.minimum(required_charge + energy, data.battery_capacity - battery_levels)
+    rise = charges - energy
+    charges_kept = rise <= following_battery_space[idx] - ROUNDING_MARGIN
+    delays = suc_delays + data.recharging_rate * charges
+
+    certain_repairs = (~merged & (battery_levels >= 0) & (arrival_times <= data.due_time[stations] - ROUNDING_MARGIN)
+                       & (np.minimum(rise, following_battery_space[idx]) > ROUNDING_MARGIN)
+                       & (delays <= forward_time_slack[idx] - ROUNDING_MARGIN) & (following_time_before_due[idx] >= ROUNDING_MARGIN))
+    # a station that is both the predecessor and the successor is merged into the predecessor
+    unaltered = (merged_pred & charged_full[idx - 1]) | (~merged_pred & merged_suc & charged_full[idx])
+    certain_fails = (unaltered | (~merged & ((delays > station_time_slack[idx] + ROUNDING_MARGIN)
+                                             | (charges_kept & (delays > forward_time_slack[idx] + ROUNDING_MARGIN)))))
+    return certain_repairs, certain_fails
+
+def insertion_costs(data, route, idx, required_charge, bounds=None):
+    """looks up the insertion costs of the stations in the ranking precomputed by the Reader,
+    stations are left out if inserting them certainly does not repair the route: the station cannot be reached
+    with the battery level upon departure from the predecessor or before its due time,
+    or the required charge after the insertion cannot be lower than required_charge.
+    A station that is the predecessor or the successor only gets a higher charge, so it is only left out if it cannot be reached.
+    With the bounds of exact_insertion_bounds, the stations are decided by decide_insertions:
+    the ones that certainly do not repair the route are left out as well, the ones that certainly do are marked
     :param data: the data of the instance,
     :param route: the route to be repaired
     :param idx: the position index of insertion
-    :return: the list of insertion costs"""
-    insertion_costs = []
+    :param required_charge: the required charge of the route
+    :param bounds: the bounds of exact_insertion_bounds, or None
+    :return: a generator of the insertion costs in ascending order, with True if the insertion certainly repairs the route
+    and False if it has to be evaluated"""
+    pred = route.visits[idx - 1]
+    suc = route.visits[idx]
+    stations = data.ranked_stations[pred.loc, suc.loc]
+    detours = data.station_detours[pred.loc, suc.loc]
+    battery_levels = pred.battery_level_upon_departure - data.station_energy[pred.loc, suc.loc]
+    arrival_times = pred.departure_time + data.distance_matrix[pred.loc, stations] / data.velocity
+    lower_bounds = route.station_insertion_required_charge(idx, detours, battery_levels)
+    # the margin keeps stations that are reachable up to the rounding of the battery levels
+    reachable = battery_levels >= -ROUNDING_MARGIN
+    # battery levels and arrival times are calculated as in insert_at, the bound of the required charge keeps a margin for rounding
+    repairing = ((battery_levels >= -FEASIBILITY_TOLERANCE) & (arrival_times <= data.due_time[stations] + FEASIBILITY_TOLERANCE)
+                 & (lower_bounds < required_charge + ROUNDING_MARGIN))
+    merged_pred = stations == pred.loc
+    merged_suc = stations == suc.loc
+    candidates = np.flatnonzero(reachable & (repairing | merged_pred | merged_suc))
+
+    certain = np.zeros(len(candidates), dtype=bool)
+    if bounds is not None and len(candidates) > 0:
+        # only the remaining candidates are decided
+        candidate_stations = stations[candidates]
+        candidate_arrival_times = arrival_times[candidates]
+        start_times = np.maximum(candidate_arrival_times, data.ready_time[candidate_stations])
+        suc_delays = (start_times + data.service_time[candidate_stations] + data.distance_matrix[candidate_stations, suc.loc] / data.velocity
+                      - suc.arrival_time)
+        certain_repairs, certain_fails = decide_insertions(data, bounds, idx, required_charge, candidate_stations, detours[candidates],
+                                                           battery_levels[candidates], candidate_arrival_times, suc_delays,
+                                                           merged_pred[candidates], merged_suc[candidates])
+        candidates = candidates[~certain_fails]
+        certain = certain_repairs[~certain_fails]
+
+    for loc, cost, repairing in zip(stations[candidates].tolist(), detours[candidates].tolist(), certain.tolist()):
+        yield loc, idx, cost, repairing
+
+def station_insertion_candidates(data, route, positions, required_charge):
+    """evaluates the insertion of every station at every given position at once, as NumPy arrays.
+    Stations are left out as in insertion_costs, and also if the delay of the successor even without charging
+    exceeds the time slack up to the next station visit. The stations are decided as in insertion_costs
+    :param data: the data of the instance,
+    :param route: the route to be repaired
+    :param positions: the position indices of insertion
+    :param required_charge: the required charge of the route
+    :return: the location indices, position indices, insertion costs and whether the insertion certainly repairs the route
+    (False if it has to be evaluated) of the remaining candidates in ascending cost order,
+    candidates of equal cost in the order of the positions and of the ranking"""
+    positions = np.asarray(positions, dtype=int)
+    if len(positions) == 0:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([]), np.array([], dtype=bool)
+
+    visits = route.visits
+    slack = route.station_time_slack
+    pred_locs = np.array([visits[idx - 1].loc for idx in positions])
+    suc_locs = np.array([visits[idx].loc for idx in positions])
+    departure_times = np.array([visits[idx - 1].departure_time for idx in positions])[:, None]
+    battery_levels_upon_departure = np.array([visits[idx - 1].battery_level_upon_departure for idx in positions])[:, None]
+    suc_arrival_times = np.array([visits[idx].arrival_time for idx in positions])[:, None]
+    time_slack = np.array([slack[idx] for idx in positions])[:, None]
+
+    # one row of the ranking per position
+    stations = data.ranked_stations[pred_locs, suc_locs]
+    detours = data.station_detours[pred_locs, suc_locs]
+    battery_levels = battery_levels_upon_departure - data.station_energy[pred_locs, suc_locs]
+    arrival_times = departure_times + data.distance_matrix[pred_locs[:, None], stations] / data.velocity
+    start_times = np.maximum(arrival_times, data.ready_time[stations])
+    suc_delays = (start_times + data.service_time[stations] + data.distance_matrix[stations, suc_locs[:, None]] / data.velocity
+                  - suc_arrival_times)
+    lower_bounds = route.station_insertion_required_charge(positions[:, None], detours, battery_levels)
+
+    # the margin keeps stations that are reachable up to the rounding of the battery levels
+    reachable = battery_levels >= -ROUNDING_MARGIN
+    # battery levels and arrival times are calculated as in insert_at, the bounds keep a margin for rounding
+    repairing = ((battery_levels >= -FEASIBILITY_TOLERANCE) & (arrival_times <= data.due_time[stations] + FEASIBILITY_TOLERANCE)
+                 & (suc_delays <= time_slack + FEASIBILITY_TOLERANCE) & (lower_bounds < required_charge + ROUNDING_MARGIN))
+    merged_pred = stations == pred_locs[:, None]
+    merged_suc = stations == suc_locs[:, None]
+    remaining = reachable & (repairing | merged_pred | merged_suc)
+
+    certain = np.zeros(stations.shape, dtype=bool)
+    bounds = exact_insertion_bounds(data, route, required_charge)
+    if bounds is not None:
+        certain, certain_fails = decide_insertions(data, bounds, positions[:, None], required_charge, stations, detours, battery_levels,
+                                                   arrival_times, suc_delays, merged_pred, merged_suc)
+        remaining &= ~certain_fails
+
+    candidates = np.flatnonzero(remaining)
 
-    for loc in data.type_range("f"):
-        pred = route.visits[idx - 1].loc
-        suc = route.visits[idx].loc
-        cost = data.distance_matrix[pred, loc] + data.distance_matrix[loc, suc] - data.distance_matrix[pred, suc]
-        insertion_costs.append((loc, idx, cost))
+    # the candidates are in the order of the positions and of the ranking, a stable sort keeps this order among equal costs
+    order = candidates[np.argsort(detours.ravel()[candidates], kind="stable")]
 
-    insertion_costs.sort(key=lambda x: x[2], reverse=False)
-    return insertion_costs
+    return (stations.ravel()[order], np.repeat(positions, stations.shape[1])[order], detours.ravel()[order],
+            certain.ravel()[order])
@@ -41,8 +41,8 @@ class StationRemoval:
         :param n_s: the number of stations to be removed
         :param solution: the current solution"""
         for i in range(n_s):
-            selected_route, selected_visit = self.rnd.choice(solution.source_visits)
-            selected_route.remove_visit(selected_visit)
+            selected_route, selected_visit = solution.random_visit(self.rnd, "f")
+            solution.remove_visit(selected_route, selected_visit)
 
     def worst_distance_station_removal(self, n_s, solution):
         """removes visits to the station that cause largest increase in distance
@@ -66,7 +66,7 @@ class StationRemoval:
         for i in range(n_s):
             removal_index = int(len(removal_costs) * (self.rnd.random() ** determinism_factor))
             route, visit, cost = removal_costs.pop(removal_index)
-            route.remove_visit(visit)
+            solution.remove_visit(route, visit)
 
 
     def worst_charge_usage_station_removal(self, n_s, solution):
@@ -109,13 +109,13 @@ class StationRemoval:
 
         for i in range(n_s):
             route, visit, cost = all_costs.pop(0)
-            route.remove_visit(visit)
+            solution.remove_visit(route, visit)
 
     def get_n_to_remove(self, solution):
         """randomly selects a number of stations to remove
         :param solution: the current solution
         :return: the number of stations to remove"""
-        n = len(solution.source_visits)
+        n = solution.count_visits("f")
         LB = min(0.1 * n, 30)
         UB = min(0.4 * n, 60)
         return int(self.rnd.uniform(LB, UB))